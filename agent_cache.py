@@ -0,0 +1,240 @@
+import contextvars
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from pydantic import BaseModel
+
+from content_cache import CACHE_DIR
+from logger import log
+
+# "exact" reuses outputs for the same agent and input, "semantic" also accepts near-identical
+# inputs (cosine similarity of local hashed n-gram vectors), "off" disables the cache.
+AGENT_CACHE_MODE = os.getenv("AGENT_CACHE_MODE", "exact")
+AGENT_CACHE_TTL = int(os.getenv("AGENT_CACHE_TTL", "43200"))
+AGENT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "2000"))
+AGENT_CACHE_SIMILARITY = float(os.getenv("AGENT_CACHE_SIMILARITY", "0.97"))
+EMBEDDING_DIM = 512
+
+
+def normalize_input(text: str) -> str:
+    return " ".join(text.split())
+
+
+def cache_scope(agent_name: str, model: str, instructions: Any, output_type: Any, tools: list[str]) -> str:
+    """Everything besides the input that shapes an agent's answer, hashed into one key.
+    Instructions are hashed so editing a prompt invalidates its cached outputs."""
+    instructions_text = instructions if isinstance(instructions, str) else getattr(instructions, "__qualname__", repr(instructions))
+    payload = json.dumps(
+        {
+            "agent": agent_name,
+            "model": model,
+            "instructions": hashlib.sha256((instructions_text or "").encode()).hexdigest(),
+            "output_type": getattr(output_type, "__name__", str(output_type)),
+            "tools": sorted(tools),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def embed(text: str) -> array:
+    """
+    Local, dependency-free text vector: word unigrams/bigrams and character trigrams hashed
+    into EMBEDDING_DIM signed buckets, L2-normalized. Good at spotting near-duplicate
+    prompts (reworded, reordered, typo'd), not at general semantic similarity.
+    """
+    words = re.findall(r"\w+", text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    joined = " ".join(words)
+    features += [joined[i:i + 3] for i in range(len(joined) - 2)]
+    vector = array("f", [0.0]) * EMBEDDING_DIM
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % EMBEDDING_DIM
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return array("f", (value / norm for value in vector))
+
+
+def cosine(a: array, b: array) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def encode_output(output: Any) -> str:
+    if isinstance(output, BaseModel):
+        return output.model_dump_json()
+    return json.dumps(output)
+
+
+def decode_output(data: str, output_type: Any) -> Any:
+    if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+        return output_type.model_validate_json(data)
+    return json.loads(data)
+
+
+@dataclass
+class CachedOutput:
+    output: str
+    created_at: float
+    similarity: float
+
+
+class AgentOutputCache:
+    """
+    SQLite-backed store of agent final outputs keyed by (scope, normalized input).
+    Entries expire after `ttl` seconds; the least recently used are evicted beyond
+    `max_entries`. In semantic mode a miss falls back to the most similar stored input
+    in the same scope whose similarity reaches `similarity`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: int = AGENT_CACHE_TTL,
+        max_entries: int = AGENT_CACHE_MAX_ENTRIES,
+        mode: str = AGENT_CACHE_MODE,
+        similarity: float = AGENT_CACHE_SIMILARITY,
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.mode = mode
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        # Hit timestamps, written with the next put() rather than committed on every hit.
+        self._touched: dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outputs (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                input TEXT NOT NULL,
+                output TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outputs_scope ON outputs (scope)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outputs_accessed_at ON outputs (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(scope: str, agent_input: str) -> str:
+        return hashlib.sha256(f"{scope}\n{normalize_input(agent_input)}".encode()).hexdigest()
+
+    def get(self, scope: str, agent_input: str) -> CachedOutput | None:
+        """Blocking SQLite lookup (and, in semantic mode, a scan of the scope); call it off the event loop."""
+        now = time.time()
+        key = self._key(scope, agent_input)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key, output, created_at FROM outputs WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+        similarity = 1.0
+        if row is None and self.mode == "semantic":
+            row, similarity = self._nearest(scope, agent_input, now)
+        if row is None:
+            return None
+        with self._lock:
+            self._touched[row[0]] = now
+        return CachedOutput(output=row[1], created_at=row[2], similarity=round(similarity, 4))
+
+    def _nearest(self, scope: str, agent_input: str, now: float) -> tuple[tuple | None, float]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, output, created_at, embedding FROM outputs WHERE scope = ? AND created_at > ?",
+                (scope, now - self.ttl),
+            ).fetchall()
+        # Embedding and scoring run outside the lock so other lookups are not held up.
+        query = embed(normalize_input(agent_input))
+        best, best_score = None, self.similarity
+        for key, output, created_at, blob in rows:
+            score = cosine(query, array("f", blob))
+            if score >= best_score:
+                best, best_score = (key, output, created_at), score
+        return best, best_score
+
+    def put(self, scope: str, agent_input: str, output: str) -> None:
+        """Blocking SQLite write; call it off the event loop."""
+        now = time.time()
+        normalized = normalize_input(agent_input)
+        embedding = embed(normalized).tobytes()
+        with self._lock:
+            self._flush_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._key(scope, agent_input), scope, normalized, output, embedding, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM outputs")
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Write pending hit timestamps (lock held) so eviction sees recent use."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE outputs SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM outputs WHERE created_at <= ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM outputs WHERE key IN (SELECT key FROM outputs ORDER BY accessed_at LIMIT ?)",
+            (count - self.max_entries,),
+        )
+        log(f"Agent output cache evicted {count - self.max_entries} entries", level="info")
+
+
+_agent_cache: AgentOutputCache | None = None
+_agent_cache_lock = threading.Lock()
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("agent_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_agent_cache() -> Iterator[None]:
+    """Run the enclosed workflow with fresh agent calls (results are still stored)."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def is_bypassed() -> bool:
+    return _bypass.get()
+
+
+def get_agent_cache() -> AgentOutputCache | None:
+    """Return the process-wide agent output cache, or None when AGENT_CACHE_MODE=off."""
+    global _agent_cache
+    if AGENT_CACHE_MODE == "off":
+        return None
+    with _agent_cache_lock:
+        if _agent_cache is None:
+            _agent_cache = AgentOutputCache(os.path.join(CACHE_DIR, "agent_outputs.sqlite3"))
+        return _agent_cache
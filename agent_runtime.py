@@ -0,0 +1,112 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import http_client
+from agent_cache import bypass_agent_cache, get_agent_cache
+from content_cache import get_content_cache
+from logger import log
+
+_DONE = object()
+
+
+class AgentRuntime:
+    """
+    One asyncio event loop running on a daemon thread for the life of the process.
+    Everything bound to a loop (the shared httpx client and its keep-alive connections,
+    LiteLLM's async clients, rate limiter waiters) survives from one workflow to the next,
+    so only the first run pays for connection setup and cache opening. Callers on other
+    threads submit coroutines and get concurrent futures back.
+    """
+
+    def __init__(self, name: str = "agent-runtime"):
+        self.loop = asyncio.new_event_loop()
+        self.started_at = time.time()
+        self.runs = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the runtime loop; safe to call from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def warm(self) -> Future:
+        """
+        Import the workflows and open the caches, the shared HTTP client and the Imgflip
+        catalog ahead of the first run, without holding up the caller.
+        """
+        return self.submit(self._warm())
+
+    async def _warm(self) -> None:
+        http_client.get_async_client()
+        get_agent_cache()
+        get_content_cache()
+        try:
+            from specialized_agents import registry
+            from specialized_agents.imgflip_catalog import get_template_catalog
+
+            await asyncio.to_thread(registry.preload)
+            await asyncio.to_thread(get_template_catalog)
+        except Exception as e:
+            log(f"Runtime warm-up failed: {e}", level="warning")
+
+    def stream(
+        self,
+        events: AsyncIterator[dict],
+        on_event: Callable[[dict], None],
+        fresh: bool = False,
+    ) -> Any:
+        """
+        Drive a workflow event stream on the runtime loop and block until it finishes.
+        on_event is called on the calling thread (Streamlit widgets must be updated from
+        the script thread); returns the output of the final "result" event.
+        """
+        pending: queue.SimpleQueue = queue.SimpleQueue()
+
+        async def consume() -> Any:
+            result = None
+            try:
+                with bypass_agent_cache() if fresh else nullcontext():
+                    async for event in events:
+                        if event["type"] == "result":
+                            result = event["output"]
+                        else:
+                            pending.put(event)
+            finally:
+                pending.put(_DONE)
+            return result
+
+        future = self.submit(consume())
+        try:
+            while (event := pending.get()) is not _DONE:
+                on_event(event)
+            return future.result()
+        finally:
+            # A Streamlit rerun interrupts the script thread; stop the workflow with it.
+            future.cancel()
+            self.runs += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Close the loop's HTTP client and stop the loop thread."""
+        if not self.running:
+            return
+        try:
+            self.submit(http_client.close_async_client()).result(timeout)
+        except Exception as e:
+            log(f"Closing the runtime HTTP client failed: {e}", level="warning")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
@@ -1,8 +1,141 @@
-import asyncio
+import atexit
+
 import streamlit as st
 
-from specialized_agents.personal_branding_agent import run_personal_branding_agent
-from specialized_agents.meme_workflow import run_twitter_meme_workflow
+import bootstrap  # noqa: F401  (first: loads .env)
+from agent_runtime import AgentRuntime
+from workflow_coalescing import coalesced_workflow_stream
+
+STAGE_LABELS = {
+    "search": "Search",
+    "planner": "Plan",
+    "plan": "Topic",
+    "linkedin": "LinkedIn",
+    "twitter": "Twitter",
+    "image": "Visuals",
+    "assembly": "Assembly",
+    "final_output": "Final Output",
+    "research": "Research",
+    "ideation": "Ideation",
+    "rendering": "Rendering",
+}
+DELTA_RENDER_STEP = 400
+
+
+@st.cache_resource(show_spinner=False)
+def get_runtime() -> AgentRuntime:
+    """One background event loop shared by every session and rerun, warmed on first use."""
+    runtime = AgentRuntime()
+    runtime.warm()
+    atexit.register(runtime.close)
+    return runtime
+
+
+def run_event_stream(events, on_event, fresh=False):
+    """Drive a workflow event stream to completion, passing progress events to on_event.
+    With fresh=True every agent runs again instead of reusing cached outputs."""
+    runtime = get_runtime()
+    if not runtime.running:
+        atexit.unregister(runtime.close)
+        get_runtime.clear()
+        runtime = get_runtime()
+    return runtime.stream(events, on_event, fresh=fresh)
+
+
+def track_progress(progress: dict, event: dict) -> bool:
+    """Fold an event into the progress dict; returns True when the view should re-render."""
+    stage = event["stage"]
+    if event["type"] == "token_delta":
+        before = progress["chars"].get(stage, 0)
+        progress["chars"][stage] = before + len(event["delta"])
+        return before // DELTA_RENDER_STEP != progress["chars"][stage] // DELTA_RENDER_STEP
+    if event["type"] == "stage_started":
+        progress["stages"][stage] = "running"
+    elif event["type"] == "stage_finished":
+        progress["stages"][stage] = "done"
+        progress["outputs"][stage] = event["output"]
+    return True
+
+
+def stage_label(stage: str) -> str:
+    """"linkedin_2" -> "LinkedIn 2" for the per-plan stages."""
+    base, _, index = stage.rpartition("_")
+    if index.isdigit() and base in STAGE_LABELS:
+        return f"{STAGE_LABELS[base]} {index}"
+    return STAGE_LABELS.get(stage, stage)
+
+
+def render_stage_status(progress: dict):
+    parts = []
+    for stage, state in progress["stages"].items():
+        label = stage_label(stage)
+        if state == "done":
+            parts.append(f"✅ {label}")
+        elif progress["chars"].get(stage):
+            parts.append(f"⏳ {label} ({progress['chars'][stage]:,} chars)")
+        else:
+            parts.append(f"⏳ {label}")
+    st.caption(" · ".join(parts))
+
+
+def render_topic(topic: str, linkedin_post: str | None, tweets: list[str] | None, image_prompt, thesis: str = ""):
+    with st.container(border=True):
+        st.subheader(topic)
+        if linkedin_post:
+            st.markdown(linkedin_post)
+        elif thesis:
+            st.caption(thesis)
+
+    if tweets:
+        with st.expander("Twitter posts"):
+            for j, tweet in enumerate(tweets, start=1):
+                st.markdown(f"**Tweet {j}**")
+                st.write(tweet)
+
+    if image_prompt:
+        with st.expander("Visual strategy"):
+            st.markdown(f"**Prompt:** {image_prompt.prompt}")
+            st.caption(f"Style: {image_prompt.style}")
+
+
+def render_branding_progress(progress: dict):
+    render_stage_status(progress)
+    outputs = progress["outputs"]
+    for idx in (1, 2):
+        # Each plan is published as soon as it streams out of the planner.
+        content_plan = outputs.get(f"plan_{idx}")
+        if content_plan is None:
+            continue
+        linkedin, twitter = outputs.get(f"linkedin_{idx}"), outputs.get(f"twitter_{idx}")
+        render_topic(
+            content_plan.topic,
+            linkedin.post if linkedin else None,
+            twitter.tweets if twitter else None,
+            outputs.get(f"image_{idx}"),
+            thesis=content_plan.thesis,
+        )
+
+
+def render_meme_progress(progress: dict):
+    render_stage_status(progress)
+    outputs = progress["outputs"]
+    if outputs.get("research"):
+        with st.expander("Web research notes"):
+            st.code(str(outputs["research"]))
+    meme_plan = outputs.get("ideation")
+    if meme_plan is None:
+        return
+    for concept in meme_plan.memes:
+        with st.container(border=True):
+            st.markdown(f"### Version {concept.version}")
+            st.caption(f"Tone: {concept.tone}")
+            st.write(f"**Angle:** {concept.angle}")
+            st.write(f"**Top text:** {concept.top_text}")
+            st.write(f"**Bottom text:** {concept.bottom_text}")
+
+
+def new_progress() -> dict:
+    return {"stages": {}, "chars": {}, "outputs": {}}
 
 # --- UI CONFIGURATION ---
 st.set_page_config(
@@ -90,6 +223,10 @@ feature_mode = st.radio(
     options=["Personal Branding Pack", "Twitter Meme Studio"],
     horizontal=True,
 )
+fresh_run = st.checkbox(
+    "Skip cached results",
+    help="Agents normally reuse their answer when given the same input again; tick to regenerate.",
+)
 
 if feature_mode == "Personal Branding Pack":
     topic_input = st.text_input(
@@ -100,40 +237,47 @@ if feature_mode == "Personal Branding Pack":
 
     col_l, col_m, col_r = st.columns([1, 1, 1])
     with col_m:
-        if st.button("Generate Content", use_container_width=True):
-            with st.spinner("Collaborating on your content..."):
-                try:
-                    cleaned_topic = topic_input.strip() if topic_input else ""
-                    result = asyncio.run(
-                        run_personal_branding_agent(user_topic=cleaned_topic or None)
-                    )
-                    st.session_state.content = result
-                    st.success("Content ready.")
-                except Exception as e:
-                    import traceback
-
-                    st.error(f"Error: {e}")
-                    st.expander("Details").code(traceback.format_exc())
+        generate_clicked = st.button("Generate Content", use_container_width=True)
+
+    if generate_clicked:
+        st.session_state.pop("content", None)
+        live = st.empty()
+        progress = new_progress()
+
+        def on_branding_event(event):
+            if track_progress(progress, event):
+                with live.container():
+                    render_branding_progress(progress)
+
+        with st.spinner("Collaborating on your content..."):
+            try:
+                cleaned_topic = topic_input.strip() if topic_input else ""
+                result = run_event_stream(
+                    coalesced_workflow_stream("personal_branding", cleaned_topic or None),
+                    on_branding_event,
+                    fresh=fresh_run,
+                )
+                st.session_state.content = result
+                live.empty()
+                st.success("Content ready.")
+            except Exception as e:
+                import traceback
+
+                st.error(f"Error: {e}")
+                st.expander("Details").code(traceback.format_exc())
 
     if "content" in st.session_state:
         data = st.session_state.content
         topics = data.topics if hasattr(data, "topics") else []
 
         for topic_data in topics:
-            with st.container(border=True):
-                st.subheader(topic_data.topic)
-                st.markdown(topic_data.linkedin_post)
-
-            with st.expander("Twitter posts"):
-                for j, tweet in enumerate(topic_data.twitter_tweets, start=1):
-                    st.markdown(f"**Tweet {j}**")
-                    st.write(tweet)
-
-            with st.expander("Visual strategy"):
-                prompt = topic_data.image_generation.image_1_prompt
-                st.markdown(f"**Prompt:** {prompt.prompt}")
-                st.caption(f"Style: {prompt.style}")
-    else:
+            render_topic(
+                topic_data.topic,
+                topic_data.linkedin_post,
+                topic_data.twitter_tweets,
+                topic_data.image_generation.image_1_prompt,
+            )
+    elif not generate_clicked:
         st.info("Click **Generate Content** to begin.")
 
 else:
@@ -167,23 +311,38 @@ else:
 
     col_l, col_m, col_r = st.columns([1, 1, 1])
     with col_m:
-        if st.button("Generate Meme Content", use_container_width=True):
-            with st.spinner("Generating 3 Twitter-focused meme versions..."):
-                try:
-                    result = asyncio.run(
-                        run_twitter_meme_workflow(
-                            user_topic=(meme_topic.strip() or None),
-                            source_mode=source_mode,
-                            output_mode=output_mode,
-                        )
-                    )
-                    st.session_state.meme_content = result
-                    st.success("Meme studio output ready.")
-                except Exception as e:
-                    import traceback
-
-                    st.error(f"Error: {e}")
-                    st.expander("Details").code(traceback.format_exc())
+        meme_clicked = st.button("Generate Meme Content", use_container_width=True)
+
+    if meme_clicked:
+        st.session_state.pop("meme_content", None)
+        live = st.empty()
+        progress = new_progress()
+
+        def on_meme_event(event):
+            if track_progress(progress, event):
+                with live.container():
+                    render_meme_progress(progress)
+
+        with st.spinner("Generating 3 Twitter-focused meme versions..."):
+            try:
+                result = run_event_stream(
+                    coalesced_workflow_stream(
+                        "twitter_meme",
+                        meme_topic.strip() or None,
+                        source_mode=source_mode,
+                        output_mode=output_mode,
+                    ),
+                    on_meme_event,
+                    fresh=fresh_run,
+                )
+                st.session_state.meme_content = result
+                live.empty()
+                st.success("Meme studio output ready.")
+            except Exception as e:
+                import traceback
+
+                st.error(f"Error: {e}")
+                st.expander("Details").code(traceback.format_exc())
 
     if "meme_content" in st.session_state:
         meme_data = st.session_state.meme_content
@@ -199,6 +358,9 @@ else:
                 st.caption(f"Tone: {item['tone']} | Template: {item['template_name']} (ID: {item['template_id']})")
                 st.write(f"**Angle:** {item['angle']}")
 
+                if item.get("meme_error"):
+                    st.warning(f"Meme image could not be rendered: {item['meme_error']}")
+
                 if output_mode in {"meme_only", "meme_and_posts"} and item.get("meme_url"):
                     st.image(item["meme_url"], use_container_width=True)
                     st.write(f"**Top text:** {item['top_text']}")
@@ -212,7 +374,7 @@ else:
                 if output_mode in {"posts_only", "meme_and_posts"}:
                     st.write("**LinkedIn Post**")
                     st.write(item["linkedin_post"])
-    else:
+    elif not meme_clicked:
         st.info("Click **Generate Meme Content** to create 3 versions.")
 
 st.markdown(
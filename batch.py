@@ -0,0 +1,227 @@
+"""
+Batch runner: generate content for many topics in one job.
+
+    python batch.py topics.txt --output batch_results.jsonl --concurrency 4 --rate-limit groq=30
+
+Topics come from a text file (one per line, "#" comments allowed) or a JSONL file with a
+"topic" field. Every finished topic is appended to the output JSONL immediately, so an
+interrupted batch resumes where it stopped: topics already recorded as "ok" are skipped.
+Runs share one event loop, so overlapping topics reuse search responses and article
+extractions (see tools.search_cache and helper_functions.shared_extract_content_text).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from typing import Any, Iterable
+
+import bootstrap  # noqa: F401  (first: loads .env)
+from agent_cache import bypass_agent_cache
+from http_client import connection_stats
+from logger import log
+from rate_limits import Limit, parse_rate_limits, rate_limiter
+from specialized_agents import get_workflow, registry
+from tracing import span
+from workflow_coalescing import normalize_topic
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+def job_key(workflow: str, topic: str, options: dict[str, Any]) -> str:
+    """Identity of one batch item, used to skip finished work on resume."""
+    suffix = "".join(f"|{name}={value}" for name, value in sorted(options.items()))
+    return f"{workflow}|{normalize_topic(topic)}{suffix}"
+
+
+def load_topics(path: str) -> list[str]:
+    topics = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                line = json.loads(line).get("topic", "")
+            if line.strip():
+                topics.append(line.strip())
+    return topics
+
+
+def load_finished(output_path: str) -> set[str]:
+    """Keys of topics already completed successfully in an earlier (possibly interrupted) run."""
+    finished: set[str] = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                log(f"Skipping unreadable line {number} in {output_path}", level="warning")
+                continue
+            if record.get("status") == "ok":
+                finished.add(record["key"])
+    return finished
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+class JsonlWriter:
+    """Append-only JSONL output; each record is flushed to disk as soon as it is written."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path):
+            # A run killed mid-write can leave a partial last line; start on a fresh one.
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, default=_json_default) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def _run_workflow(workflow: str, topic: str, options: dict[str, Any]) -> Any:
+    run = get_workflow(workflow)
+    if workflow == "personal_branding":
+        return await run(user_topic=topic)
+    return await run(
+        user_topic=topic,
+        source_mode=options.get("source_mode", "web_search"),
+        output_mode=options.get("output_mode", "meme_and_posts"),
+    )
+
+
+async def run_batch(
+    topics: Iterable[str],
+    output_path: str,
+    workflow: str = "personal_branding",
+    concurrency: int = BATCH_CONCURRENCY,
+    rate_limits: dict[str, Limit | float] | None = None,
+    resume: bool = True,
+    fresh: bool = False,
+    **options: Any,
+) -> dict:
+    """
+    Run `workflow` for every topic with at most `concurrency` runs in flight, appending one
+    JSONL record per topic to `output_path` as it finishes.
+
+    Args:
+        topics: Topic strings; duplicates (after whitespace/case normalization) run once.
+        rate_limits: Per provider or provider/model limits, as requests per minute
+            (e.g. {"serpapi": 20}) or Limit(rpm, tpm); applied to every model and API call
+            while the batch runs, then the previous limits are restored.
+        resume: Skip topics already recorded as "ok" in `output_path`.
+        fresh: Run every agent again instead of reusing cached agent outputs.
+        options: Extra workflow options (source_mode / output_mode for "twitter_meme").
+
+    Returns:
+        Summary dict with total, skipped, succeeded and failed counts.
+    """
+    if workflow not in registry.WORKFLOWS:
+        raise ValueError(f"Unknown workflow {workflow!r}")
+
+    finished = load_finished(output_path) if resume else set()
+    jobs: dict[str, str] = {}
+    for topic in topics:
+        jobs.setdefault(job_key(workflow, topic, options), topic)
+    pending = {key: topic for key, topic in jobs.items() if key not in finished}
+    summary = {"total": len(jobs), "skipped": len(jobs) - len(pending), "succeeded": 0, "failed": 0}
+    log(f"Batch: {len(pending)} topics to run, {summary['skipped']} already done", level="highlight")
+
+    # Import the workflow and LiteLLM off the loop so the first runs do not stall the others.
+    await asyncio.to_thread(registry.preload, workflow)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    writer = JsonlWriter(output_path)
+
+    async def run_one(key: str, topic: str) -> None:
+        async with slots:
+            started = time.time()
+            record = {"key": key, "workflow": workflow, "topic": topic, "options": options}
+            try:
+                with span("batch.item", workflow=workflow, topic=topic), (
+                    bypass_agent_cache() if fresh else nullcontext()
+                ):
+                    output = await _run_workflow(workflow, topic, options)
+                record.update(status="ok", output=output, error=None)
+                summary["succeeded"] += 1
+                log(f"Batch topic done: {topic}", level="success")
+            except Exception as e:
+                record.update(status="error", output=None, error=f"{type(e).__name__}: {e}")
+                summary["failed"] += 1
+                log(f"Batch topic failed: {topic}: {e}", level="error")
+            record.update(started_at=started, duration_s=round(time.time() - started, 3))
+            writer.write(record)
+
+    try:
+        # Limits given for this batch apply only while it runs; the process-wide ones come back after.
+        with rate_limiter.configured(rate_limits) if rate_limits else nullcontext():
+            await asyncio.gather(*(run_one(key, topic) for key, topic in pending.items()))
+    finally:
+        writer.close()
+
+    from specialized_agents.tools import search_cache
+
+    log(
+        f"Batch finished: {summary} (search cache: {search_cache.stats()}, rate limits: {rate_limiter.stats()}, "
+        f"connections: {connection_stats()})",
+        level="highlight",
+    )
+    return summary
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Generate content for many topics in one job.")
+    parser.add_argument("topics_file", help="Text file with one topic per line, or JSONL with a 'topic' field")
+    parser.add_argument("--output", default="batch_results.jsonl")
+    parser.add_argument("--workflow", choices=tuple(registry.WORKFLOWS), default="personal_branding")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Topics run at the same time")
+    parser.add_argument(
+        "--rate-limit", action="append", default=[], metavar="KEY=RPM[:TPM]",
+        help="Limit for a provider (groq, gemini, gnews, serpapi, imgflip) or provider/model; repeatable",
+    )
+    parser.add_argument("--source-mode", choices=("user_topic", "web_search"), default="web_search")
+    parser.add_argument("--output-mode", choices=("meme_only", "posts_only", "meme_and_posts"), default="meme_and_posts")
+    parser.add_argument("--no-resume", action="store_true", help="Rerun topics already recorded as ok")
+    parser.add_argument("--fresh", action="store_true", help="Skip cached agent outputs")
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.workflow == "twitter_meme":
+        options = {"source_mode": args.source_mode, "output_mode": args.output_mode}
+    return asyncio.run(
+        run_batch(
+            load_topics(args.topics_file),
+            args.output,
+            workflow=args.workflow,
+            concurrency=args.concurrency,
+            rate_limits=parse_rate_limits(",".join(args.rate_limit)),
+            resume=not args.no_resume,
+            fresh=args.fresh,
+            **options,
+        )
+    )
+
+
+if __name__ == "__main__":
+    summary = main()
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,246 @@
+"""
+Corpus benchmark for the HTML parser backends used by the extraction chain.
+
+Runs each extractor over every page in the corpus (the text/html HTTP fixtures plus any
+benchmarks/corpus/*.html) with each backend, and reports parse and extraction time, peak
+Python heap during a pass, and how closely each backend's text matches html.parser's.
+It also compares the buffered download path (join chunks, decode, parse) with the
+streaming decoder, with and without early stop: bytes consumed, time, peak heap and whether
+the extracted text matches.
+
+The pages shipped with the repo are all synthetic, so the agreement figures only show that the
+backends agree with each other on them, not how well they extract real news pages; add real
+pages with --save for that.
+
+    python -m benchmarks.extractors --repeat 20
+    python -m benchmarks.extractors --save https://example.com/some-article   # add a page to the corpus
+"""
+import argparse
+import difflib
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import helper_functions
+from benchmarks.http_replay import HttpFixtures
+from helper_functions import EXTRACTION_CHAIN, STREAM_CHUNK_BYTES, FetchedDocument, extract_document_text, parse_html
+from html_stream import HtmlStreamDecoder
+from logger import log_level
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+BACKENDS = ("html.parser", "lxml")
+BASELINE_BACKEND = "html.parser"
+
+
+def load_corpus(fixtures_dir: str = FIXTURES_DIR, corpus_dir: str = CORPUS_DIR) -> dict[str, bytes]:
+    pages: dict[str, bytes] = {}
+    fixtures = HttpFixtures(fixtures_dir)
+    for fixture in fixtures._fixtures.values():
+        if fixture.headers.get("Content-Type", "").startswith("text/html"):
+            pages[fixture.url] = fixtures.lookup(fixture.method, fixture.url)[1]
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(path, "rb") as f:
+            pages[f"file://{os.path.basename(path)}"] = f.read()
+    return pages
+
+
+def save_page(url: str, corpus_dir: str = CORPUS_DIR) -> str:
+    document = helper_functions.fetch_document(url)
+    if document.error_code:
+        raise SystemExit(f"Could not fetch {url}: {document.error_code}")
+    os.makedirs(corpus_dir, exist_ok=True)
+    slug = "".join(c if c.isalnum() else "-" for c in url.split("://", 1)[-1]).strip("-")[:80]
+    path = os.path.join(corpus_dir, f"{slug}.html")
+    with open(path, "wb") as f:
+        f.write(document.raw)
+    return path
+
+
+def parse_only(html: str, backend: str) -> None:
+    if backend == "lxml":
+        parse_html(html)
+    else:
+        BeautifulSoup(html, "html.parser")
+
+
+def run_chain(url: str, raw: bytes) -> tuple[dict[str, float], dict[str, str | None]]:
+    """One pass of every extractor over a fresh document; returns per-extractor ms and text."""
+    document = FetchedDocument(url, raw=raw, status_code=200)
+    timings, texts = {}, {}
+    for name, extractor in EXTRACTION_CHAIN:
+        started = time.perf_counter()
+        texts[name] = extractor(document)
+        timings[name] = (time.perf_counter() - started) * 1000
+    return timings, texts
+
+
+def bench_backend(backend: str, pages: dict[str, bytes], repeat: int) -> dict:
+    helper_functions.HTML_PARSER_BACKEND = backend
+    parse_ms: list[float] = []
+    extract_ms: dict[str, list[float]] = {name: [] for name, _ in EXTRACTION_CHAIN}
+    texts: dict[str, dict[str, str | None]] = {}
+
+    with log_level("off"):  # extractor logging would dominate the timings
+        for url, raw in pages.items():
+            html = raw.decode("utf-8", errors="replace")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                parse_only(html, backend)
+                parse_ms.append((time.perf_counter() - started) * 1000)
+                timings, texts[url] = run_chain(url, raw)
+                for name, value in timings.items():
+                    extract_ms[name].append(value)
+
+        tracemalloc.start()
+        for url, raw in pages.items():
+            run_chain(url, raw)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "parse_ms": round(statistics.median(parse_ms), 3),
+        "extract_ms": {name: round(statistics.median(values), 3) for name, values in extract_ms.items()},
+        "peak_kib": round(peak / 1024, 1),
+        "texts": texts,
+    }
+
+
+def _buffered_document(url: str, raw: bytes, chunk_size: int) -> FetchedDocument:
+    chunks = [raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)]
+    document = FetchedDocument(url, raw=b"".join(chunks), status_code=200)
+    document.tree  # decode + parse, as the extractors would
+    return document
+
+
+def _streamed_document(url: str, raw: bytes, chunk_size: int, early_stop: bool = False) -> tuple[FetchedDocument, int]:
+    decoder = HtmlStreamDecoder(max_bytes=helper_functions.MAX_HTML_BYTES, early_stop=early_stop)
+    for i in range(0, len(raw), chunk_size):
+        if decoder.feed(raw[i:i + chunk_size]):
+            break
+    consumed = decoder.bytes_read
+    data, tree = decoder.close()
+    document = FetchedDocument(
+        url, raw=data, encoding=decoder.document_encoding, status_code=200, parsed=tree, truncated=decoder.truncated
+    )
+    return document, consumed
+
+
+def bench_decode(pages: dict[str, bytes], repeat: int, chunk_size: int = STREAM_CHUNK_BYTES) -> dict:
+    """Buffered vs streaming (with and without HTML_EARLY_STOP) download handling, lxml backend, extraction chain included."""
+    helper_functions.HTML_PARSER_BACKEND = "lxml"
+    results = {}
+    with log_level("off"):
+        texts = {url: extract_document_text(_buffered_document(url, raw, chunk_size))[0] for url, raw in pages.items()}
+        for mode in ("buffered", "streaming", "early_stop"):
+            timings: list[float] = []
+            consumed = 0
+            matches = 0
+            for url, raw in pages.items():
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    if mode == "buffered":
+                        document, read = _buffered_document(url, raw, chunk_size), len(raw)
+                    else:
+                        document, read = _streamed_document(url, raw, chunk_size, early_stop=mode == "early_stop")
+                    text, _ = extract_document_text(document)
+                    timings.append((time.perf_counter() - started) * 1000)
+                consumed += read
+                matches += text == texts[url]
+
+            def fetch(url: str, raw: bytes) -> FetchedDocument:
+                if mode == "buffered":
+                    return _buffered_document(url, raw, chunk_size)
+                return _streamed_document(url, raw, chunk_size, early_stop=mode == "early_stop")[0]
+
+            # Download handling alone (bytes to decoded HTML + tree), then the whole fetch-to-text pass.
+            tracemalloc.start()
+            for url, raw in pages.items():
+                fetch(url, raw).html
+            _, fetch_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            for url, raw in pages.items():
+                extract_document_text(fetch(url, raw))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[mode] = {
+                "ms": round(statistics.median(timings), 3),
+                "bytes_read": consumed,
+                "fetch_peak_kib": round(fetch_peak / 1024, 1),
+                "peak_kib": round(peak / 1024, 1),
+                "same_text": f"{matches}/{len(pages)}",
+            }
+    return results
+
+
+def agreement(texts: dict[str, dict[str, str | None]], baseline: dict[str, dict[str, str | None]]) -> dict[str, float]:
+    """Mean SequenceMatcher ratio per extractor against the baseline backend's output."""
+    ratios: dict[str, list[float]] = {name: [] for name, _ in EXTRACTION_CHAIN}
+    for url, by_extractor in texts.items():
+        for name, text in by_extractor.items():
+            expected = baseline[url][name]
+            if text is None and expected is None:
+                ratios[name].append(1.0)
+            else:
+                ratios[name].append(difflib.SequenceMatcher(None, text or "", expected or "", autojunk=False).ratio())
+    return {name: round(statistics.fmean(values), 4) for name, values in ratios.items() if values}
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends over the extraction corpus.")
+    parser.add_argument("--repeat", type=int, default=10, help="Passes per page when timing")
+    parser.add_argument("--backend", choices=(*BACKENDS, "all"), default="all")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--save", metavar="URL", help="Fetch a live page into the corpus and exit")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.save:
+        print(f"Saved {save_page(args.save, args.corpus)}")
+        return {}
+
+    pages = load_corpus(args.fixtures, args.corpus)
+    backends = BACKENDS if args.backend == "all" else tuple({BASELINE_BACKEND, args.backend})
+    results = {backend: bench_backend(backend, pages, args.repeat) for backend in backends}
+    baseline_texts = results[BASELINE_BACKEND]["texts"]
+    for data in results.values():
+        data["agreement"] = agreement(data.pop("texts"), baseline_texts)
+
+    print(f"{len(pages)} pages, {args.repeat} passes each (medians per page)\n")
+    names = [name for name, _ in EXTRACTION_CHAIN]
+    print(f"{'backend':<14}{'parse ms':>10}" + "".join(f"{name + ' ms':>17}" for name in names) + f"{'peak KiB':>11}")
+    for backend, data in results.items():
+        print(
+            f"{backend:<14}{data['parse_ms']:>10.2f}"
+            + "".join(f"{data['extract_ms'][name]:>17.2f}" for name in names)
+            + f"{data['peak_kib']:>11.1f}"
+        )
+    print(f"\nText agreement with {BASELINE_BACKEND} (1.0 = identical)")
+    for backend, data in results.items():
+        print(f"{backend:<14}" + "".join(f"{name}={ratio:.4f}  " for name, ratio in data["agreement"].items()))
+
+    results["decode"] = bench_decode(pages, args.repeat)
+    print(f"\nDownload handling ({STREAM_CHUNK_BYTES // 1024} KiB chunks, fetch-to-text per page)")
+    print(f"{'mode':<14}{'ms':>10}{'bytes read':>14}{'fetch peak KiB':>16}{'peak KiB':>11}{'same text':>12}")
+    for mode, data in results["decode"].items():
+        print(
+            f"{mode:<14}{data['ms']:>10.2f}{data['bytes_read']:>14}{data['fetch_peak_kib']:>16.1f}"
+            f"{data['peak_kib']:>11.1f}{data['same_text']:>12}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() is not None else 1)
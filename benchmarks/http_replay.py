@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+import http_client
+from logger import log
+from response_cache import make_cache_key
+
+INDEX_FILE = "http.json"
+BODY_DIR = "http"
+
+
+def fixture_key(method: str, url: str) -> str:
+    """Match key for a request: method + URL with credentials dropped and params sorted."""
+    parts = urlsplit(url)
+    endpoint = f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}"
+    return make_cache_key(endpoint, dict(parse_qsl(parts.query, keep_blank_values=True)))
+
+
+@dataclass
+class HttpFixture:
+    method: str
+    url: str
+    status: int
+    headers: dict[str, str]
+    body_file: str
+
+
+class HttpFixtures:
+    """Recorded HTTP responses stored as an index (http.json) plus one body file per response."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._fixtures: dict[str, HttpFixture] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for entry in json.load(f):
+                    fixture = HttpFixture(**entry)
+                    self._fixtures[fixture_key(fixture.method, fixture.url)] = fixture
+
+    def lookup(self, method: str, url: str) -> tuple[HttpFixture, bytes] | None:
+        fixture = self._fixtures.get(fixture_key(method, url))
+        if fixture is None:
+            return None
+        with open(os.path.join(self.directory, fixture.body_file), "rb") as f:
+            return fixture, f.read()
+
+    def record(self, method: str, url: str, status: int, headers: dict[str, str], body: bytes) -> None:
+        key = fixture_key(method, url)
+        body_file = f"{BODY_DIR}/{hashlib.sha1(key.encode()).hexdigest()[:16]}.body"
+        os.makedirs(os.path.join(self.directory, BODY_DIR), exist_ok=True)
+        with open(os.path.join(self.directory, body_file), "wb") as f:
+            f.write(body)
+        kept_headers = {
+            name: value for name, value in headers.items()
+            if name.lower() in {"content-type", "etag", "last-modified"}
+        }
+        self._fixtures[key] = HttpFixture(method.upper(), _redact(url), status, kept_headers, body_file)
+
+    def save(self) -> None:
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(fixture) for fixture in self._fixtures.values()], f, indent=2)
+
+
+def _redact(url: str) -> str:
+    parts = urlsplit(url)
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in {"token", "api_key", "apikey", "key"}
+    ]
+    return parts._replace(query="&".join(f"{name}={value}" for name, value in query)).geturl()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering from fixtures after `latency` seconds, or recording live traffic."""
+
+    def __init__(self, fixtures: HttpFixtures, latency: float = 0.0, record: bool = False):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.record = record
+        self._live = httpx.AsyncHTTPTransport() if record else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if self._live is not None:
+            response = await self._live.handle_async_request(request)
+            body = await response.aread()
+            self.fixtures.record(request.method, url, response.status_code, dict(response.headers), body)
+            return httpx.Response(response.status_code, headers=response.headers, content=body, request=request)
+
+        await asyncio.sleep(self.latency)
+        found = self.fixtures.lookup(request.method, url)
+        if found is None:
+            log(f"No HTTP fixture for {request.method} {url}", level="warning")
+            return httpx.Response(404, content=b"no fixture", request=request)
+        fixture, body = found
+        return httpx.Response(fixture.status, headers=fixture.headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        if self._live is not None:
+            await self._live.aclose()
+
+
+class SyncReplayTransport(httpx.BaseTransport):
+    """Sync counterpart of ReplayTransport for the shared httpx.Client."""
+
+    def __init__(self, fixtures: HttpFixtures, latency: float = 0.0, record: bool = False):
+        self.fixtures = fixtures
+        self.latency = latency
+        self._live = httpx.HTTPTransport() if record else None
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if self._live is not None:
+            response = self._live.handle_request(request)
+            body = response.read()
+            self.fixtures.record(request.method, url, response.status_code, dict(response.headers), body)
+            return httpx.Response(response.status_code, headers=response.headers, content=body, request=request)
+
+        time.sleep(self.latency)
+        found = self.fixtures.lookup(request.method, url)
+        if found is None:
+            log(f"No HTTP fixture for {request.method} {url}", level="warning")
+            return httpx.Response(404, content=b"no fixture", request=request)
+        fixture, body = found
+        return httpx.Response(fixture.status, headers=fixture.headers, content=body, request=request)
+
+    def close(self) -> None:
+        if self._live is not None:
+            self._live.close()
+
+
+@contextmanager
+def replay_http(fixtures: HttpFixtures, latency: float = 0.0, record: bool = False):
+    """Route the shared sync and async httpx clients through the fixtures."""
+    http_client.set_async_transport(ReplayTransport(fixtures, latency=latency, record=record))
+    http_client.set_transport(SyncReplayTransport(fixtures, latency=latency, record=record))
+    try:
+        yield fixtures
+    finally:
+        http_client.set_async_transport(None)
+        http_client.set_transport(None)
+        if record:
+            fixtures.save()
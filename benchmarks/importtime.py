@@ -0,0 +1,99 @@
+"""
+Cold-start import cost of each entry point, from `python -X importtime`.
+
+    python -m benchmarks.importtime                     # print the table
+    python -m benchmarks.importtime --write             # refresh benchmarks/importtime.md
+
+Each target is imported in a fresh interpreter (so nothing is cached in sys.modules) several
+times; the report gives the median total and the packages that account for most of it.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+REPORT_PATH = os.path.join(BENCH_DIR, "importtime.md")
+# app is a Streamlit script; importing it outside `streamlit run` renders the page in bare mode.
+TARGETS = (
+    "app",
+    "batch",
+    "service",
+    "specialized_agents.meme_workflow",
+    "specialized_agents.personal_branding_agent",
+)
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(target: str) -> tuple[float, dict[str, float]]:
+    """Total import time in ms and self time per top-level package for one fresh import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    per_package: dict[str, float] = defaultdict(float)
+    for match in LINE.finditer(proc.stderr):
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        if len(indent) == 1:
+            total_us += cumulative_us
+        per_package[name.split(".")[0]] += self_us / 1000
+    return total_us / 1000, per_package
+
+
+def profile(target: str, repeat: int) -> dict:
+    totals, packages = [], defaultdict(list)
+    for _ in range(repeat):
+        total, per_package = measure(target)
+        totals.append(total)
+        for name, ms in per_package.items():
+            packages[name].append(ms)
+    heaviest = sorted(((statistics.median(v), k) for k, v in packages.items()), reverse=True)[:5]
+    return {
+        "total_ms": round(statistics.median(totals), 1),
+        "heaviest": [(name, round(ms, 1)) for ms, name in heaviest],
+    }
+
+
+def render(results: dict[str, dict]) -> str:
+    lines = [
+        "| entry point | median import ms | heaviest packages (self ms) |",
+        "|---|---:|---|",
+    ]
+    for target, data in results.items():
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in data["heaviest"])
+        lines.append(f"| `{target}` | {data['total_ms']:.0f} | {heaviest} |")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the entry points.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target", action="append", help="Module to import (repeatable; default: all entry points)")
+    parser.add_argument("--write", action="store_true", help=f"Write the table into {os.path.relpath(REPORT_PATH, REPO_DIR)}")
+    args = parser.parse_args(argv)
+
+    results = {target: profile(target, args.repeat) for target in args.target or TARGETS}
+    table = render(results)
+    print(table)
+    if args.write:
+        with open(REPORT_PATH, encoding="utf-8") as f:
+            report = f.read()
+        start, end = "<!-- importtime:start -->", "<!-- importtime:end -->"
+        head, _, rest = report.partition(start)
+        _, _, tail = rest.partition(end)
+        with open(REPORT_PATH, "w", encoding="utf-8") as f:
+            f.write(f"{head}{start}\n{table}\n{end}{tail}")
+        print(f"\nReport updated: {REPORT_PATH}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
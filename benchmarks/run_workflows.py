@@ -0,0 +1,221 @@
+"""
+Offline end-to-end benchmark for both workflows.
+
+Replays recorded HTTP fixtures for article fetches, GNews, SerpAPI and Imgflip, and swaps
+every agent model for a deterministic StubModel, so runs cost nothing and are repeatable.
+
+    python -m benchmarks.run_workflows --runs 5 --llm-latency 0.3 --http-latency 0.05
+    python -m benchmarks.run_workflows --compare benchmarks/results/<commit>.json
+    python -m benchmarks.run_workflows --runtime  # every run on one long-lived loop, like the Streamlit app
+    python -m benchmarks.run_workflows --record   # refresh fixtures from the live APIs (needs .env keys)
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# Stub credentials so tools and Imgflip calls build their requests; fixtures never see them.
+for _name in ("GNEWS_API_KEY", "SERP_API_KEY", "IMGFLIP_USERNAME", "IMGFLIP_PASSWORD", "GROQ_API_KEY", "GOOGLE_API_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+
+from agents import set_tracing_disabled
+
+import agent_cache
+import content_cache
+import tracing
+from agent_runtime import AgentRuntime
+from benchmarks.http_replay import HttpFixtures, replay_http
+from benchmarks.stub_model import install_stub_models
+from logger import flush_logs
+from specialized_agents import get_workflow, imgflip_catalog, registry, tools
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+ALL_AGENTS = registry.all_agents()
+WORKFLOWS = tuple(registry.WORKFLOWS)
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans: list[tracing.Span] = []
+
+    def export(self, spans: list[tracing.Span]) -> None:
+        self.spans.extend(spans)
+
+
+async def _drain(events) -> None:
+    async for _ in events:
+        pass
+
+
+async def run_workflow(name: str, topic: str, stream: bool) -> None:
+    kwargs = {"user_topic": topic}
+    if name == "twitter_meme":
+        kwargs.update(source_mode="web_search", output_mode="meme_and_posts")
+    if stream:
+        await _drain(get_workflow(name, stream=True)(**kwargs))
+    else:
+        await get_workflow(name)(**kwargs)
+
+
+def reset_caches(scratch_dir: str) -> None:
+    """Start a run cold: empty search cache, content cache, agent output cache and Imgflip catalog."""
+    tools.search_cache.clear()
+    agent_cache._agent_cache = agent_cache.AgentOutputCache(
+        os.path.join(scratch_dir, f"agents-{time.time_ns()}.sqlite3")
+    )
+    content_cache._content_cache = content_cache.ContentCache(
+        os.path.join(scratch_dir, f"content-{time.time_ns()}.sqlite3")
+    )
+    imgflip_catalog.CATALOG_SNAPSHOT_PATH = os.path.join(scratch_dir, f"imgflip-{time.time_ns()}.json")
+    imgflip_catalog._catalog = None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(values), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "mean_ms": round(statistics.fmean(values), 2),
+    }
+
+
+def aggregate(spans: list[tracing.Span], workflow: str) -> dict:
+    """Per-run totals for each span name, summarized across the runs of one workflow."""
+    roots = [s for s in spans if s.parent_id is None and s.name == f"workflow.{workflow}"]
+    root_traces = {s.trace_id for s in roots}
+    per_run: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    calls: dict[str, int] = defaultdict(int)
+    for s in spans:
+        if s.trace_id in root_traces and s.parent_id is not None:
+            per_run[s.trace_id][s.name] += s.duration_ms or 0.0
+            calls[s.name] += 1
+
+    stage_names = sorted({name for run in per_run.values() for name in run})
+    return {
+        "runs": len(roots),
+        "end_to_end": summarize([s.duration_ms for s in roots]),
+        "stages": {
+            name: {
+                **summarize([per_run[trace_id].get(name, 0.0) for trace_id in root_traces]),
+                "calls_per_run": round(calls[name] / len(roots), 2),
+            }
+            for name in stage_names
+        },
+    }
+
+
+def git_revision() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: dict, baseline: dict | None = None) -> None:
+    for workflow, data in results["workflows"].items():
+        base = (baseline or {}).get("workflows", {}).get(workflow, {})
+        print(f"\n== {workflow} ({data['runs']} runs) ==")
+        header = f"{'stage':<34}{'median ms':>12}{'p95 ms':>12}{'calls':>8}"
+        print(header + (f"{'base med':>12}{'delta':>9}" if base else ""))
+        rows = [("END TO END", data["end_to_end"], None)] + [
+            (name, stats, stats["calls_per_run"]) for name, stats in data["stages"].items()
+        ]
+        for name, stats, n_calls in rows:
+            line = f"{name:<34}{stats['median_ms']:>12.1f}{stats['p95_ms']:>12.1f}{'' if n_calls is None else n_calls:>8}"
+            base_stats = base.get("end_to_end") if n_calls is None else base.get("stages", {}).get(name)
+            if base_stats:
+                delta = (stats["median_ms"] - base_stats["median_ms"]) / base_stats["median_ms"] * 100 if base_stats["median_ms"] else 0.0
+                line += f"{base_stats['median_ms']:>12.1f}{delta:>+8.1f}%"
+            print(line)
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the BrandFlow workflows.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workflow", choices=(*WORKFLOWS, "all"), default="all")
+    parser.add_argument("--topic", default="AI agents in production")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per stub model call")
+    parser.add_argument("--http-latency", type=float, default=0.02, help="Seconds per replayed HTTP request")
+    parser.add_argument("--stream", action="store_true", help="Benchmark the stream_* entry points")
+    parser.add_argument("--warm", action="store_true", help="Keep caches between runs")
+    parser.add_argument("--runtime", action="store_true", help="Run on one persistent event loop instead of asyncio.run per run")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline results JSON to diff against")
+    parser.add_argument("--record", action="store_true", help="Record live HTTP traffic into the fixtures")
+    args = parser.parse_args(argv)
+
+    set_tracing_disabled(True)
+    with open(os.path.join(args.fixtures, "llm.json"), encoding="utf-8") as f:
+        install_stub_models(ALL_AGENTS, json.load(f), latency=args.llm_latency)
+    registry.preload()  # keep the deferred imports out of the first run's timings
+
+    collector = CollectingExporter()
+    tracing.configure_tracing([collector])
+    workflows = WORKFLOWS if args.workflow == "all" else (args.workflow,)
+
+    with tempfile.TemporaryDirectory() as scratch_dir, replay_http(
+        HttpFixtures(args.fixtures), latency=args.http_latency, record=args.record
+    ):
+        reset_caches(scratch_dir)
+        runtime = AgentRuntime() if args.runtime else None
+        for workflow in workflows:
+            for _ in range(args.runs):
+                if not args.warm:
+                    reset_caches(scratch_dir)
+                if runtime is not None:
+                    runtime.submit(run_workflow(workflow, args.topic, args.stream)).result()
+                else:
+                    asyncio.run(run_workflow(workflow, args.topic, args.stream))
+        if runtime is not None:
+            runtime.close()
+        tracing.configure_tracing([])  # flushes the collector
+
+    results = {
+        "commit": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {
+            "runs": args.runs,
+            "llm_latency": args.llm_latency,
+            "http_latency": args.http_latency,
+            "stream": args.stream,
+            "warm": args.warm,
+            "runtime": args.runtime,
+        },
+        "workflows": {workflow: aggregate(collector.spans, workflow) for workflow in workflows},
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    flush_logs()  # the workflows' queued log lines go out before the report
+    print_report(results, baseline)
+    print(f"\nResults written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
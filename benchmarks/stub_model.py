@@ -0,0 +1,127 @@
+import asyncio
+import json
+import uuid
+from typing import Any, AsyncIterator
+
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+
+from agents import Agent
+from agents.items import ModelResponse
+from agents.models.interface import Model
+from agents.usage import Usage
+
+STREAM_CHUNK_CHARS = 24
+
+
+def _estimate_tokens(value: Any) -> int:
+    return max(1, len(str(value)) // 4)
+
+
+class StubModel(Model):
+    """
+    Deterministic stand-in for LitellmModel. Replies with a canned output after
+    `latency` seconds; if `tool_calls` are configured, the first turn calls those
+    tools and the canned output is returned once their results are in the input.
+    """
+
+    def __init__(self, name: str, output: Any, tool_calls: list[dict] | None = None, latency: float = 0.0):
+        self.model = f"stub/{name}"
+        self.text = output if isinstance(output, str) else json.dumps(output)
+        self.tool_calls = tool_calls or []
+        self.latency = latency
+
+    def _output_items(self, input_items: Any) -> list:
+        has_tool_results = isinstance(input_items, list) and any(
+            isinstance(item, dict) and item.get("type") == "function_call_output" for item in input_items
+        )
+        if self.tool_calls and not has_tool_results:
+            return [
+                ResponseFunctionToolCall(
+                    type="function_call",
+                    id=f"fc_{uuid.uuid4().hex[:12]}",
+                    call_id=f"call_{uuid.uuid4().hex[:12]}",
+                    name=call["name"],
+                    arguments=json.dumps(call.get("arguments", {})),
+                    status="completed",
+                )
+                for call in self.tool_calls
+            ]
+        return [
+            ResponseOutputMessage(
+                id=f"msg_{uuid.uuid4().hex[:12]}",
+                type="message",
+                role="assistant",
+                status="completed",
+                content=[ResponseOutputText(type="output_text", text=self.text, annotations=[])],
+            )
+        ]
+
+    def _usage(self, system_instructions: str | None, input_items: Any, output: list) -> Usage:
+        input_tokens = _estimate_tokens(system_instructions or "") + _estimate_tokens(input_items)
+        output_tokens = _estimate_tokens(output)
+        return Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    async def get_response(self, system_instructions, input, *args, **kwargs) -> ModelResponse:
+        await asyncio.sleep(self.latency)
+        output = self._output_items(input)
+        return ModelResponse(output=output, usage=self._usage(system_instructions, input, output), response_id=None)
+
+    async def stream_response(self, system_instructions, input, *args, **kwargs) -> AsyncIterator:
+        output = self._output_items(input)
+        message = next((item for item in output if isinstance(item, ResponseOutputMessage)), None)
+        chunks = (
+            [self.text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(self.text), STREAM_CHUNK_CHARS)]
+            if message else []
+        )
+        await asyncio.sleep(self.latency / (len(chunks) + 1))
+        for seq, chunk in enumerate(chunks):
+            yield ResponseTextDeltaEvent(
+                type="response.output_text.delta",
+                item_id=message.id,
+                output_index=0,
+                content_index=0,
+                delta=chunk,
+                logprobs=[],
+                sequence_number=seq,
+            )
+            await asyncio.sleep(self.latency / (len(chunks) + 1))
+
+        usage = self._usage(system_instructions, input, output)
+        response = Response.model_construct(
+            id=f"resp_{uuid.uuid4().hex[:12]}",
+            created_at=0,
+            model=self.model,
+            object="response",
+            output=output,
+            parallel_tool_calls=False,
+            tool_choice="auto",
+            tools=[],
+            usage=None,
+        )
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=len(chunks))
+
+
+def install_stub_models(agents: list[Agent], outputs: dict[str, dict], latency: float) -> None:
+    """Swap each agent's model for a StubModel configured from `outputs[agent.name]`."""
+    for agent in agents:
+        spec = outputs.get(agent.name)
+        if spec is None:
+            raise KeyError(f"No stub output configured for agent {agent.name!r}")
+        agent.model = StubModel(
+            agent.name,
+            spec["output"],
+            tool_calls=spec.get("tool_calls"),
+            latency=spec.get("latency", latency),
+        )
@@ -0,0 +1,8 @@
+"""
+Process setup shared by the entry points (app.py, batch.py, service.py). Import it before
+any other project module: logger, the caches, rate_limits, http_client and html_stream read
+their settings from the environment when imported, so .env has to be loaded first.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
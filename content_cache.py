@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from logger import log
+
+CACHE_DIR = os.getenv("BRANDFLOW_CACHE_DIR", ".cache")
+CONTENT_CACHE_ENABLED = os.getenv("CONTENT_CACHE_ENABLED", "1") != "0"
+CONTENT_CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", "3600"))
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key for a URL: lowercased scheme/host, no default port,
+    fragment or tracking parameters, and sorted query parameters."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+@dataclass
+class CachedPage:
+    url: str
+    raw: bytes
+    encoding: str
+    extractor: str
+    text: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+    def is_fresh(self, ttl: int = CONTENT_CACHE_TTL) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers for revalidating a stale entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ContentCache:
+    """
+    SQLite-backed store of fetched pages and their extracted text, keyed by normalized URL.
+    Entries expire after `ttl` seconds and the least recently used ones are evicted
+    once the stored HTML exceeds `max_bytes`.
+    """
+
+    def __init__(self, path: str, ttl: int = CONTENT_CACHE_TTL, max_bytes: int = CONTENT_CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                raw BLOB NOT NULL,
+                encoding TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                text TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._conn.commit()
+
+    def get(self, url: str) -> CachedPage | None:
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, raw, encoding, extractor, text, etag, last_modified, fetched_at "
+                "FROM pages WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return CachedPage(*row)
+
+    def put(
+        self,
+        url: str,
+        raw: bytes,
+        encoding: str,
+        extractor: str,
+        text: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), url, raw, encoding, extractor, text, etag, last_modified, now, now, len(raw)),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as freshly validated (e.g. after a 304 Not Modified)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, normalize_url(url)),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        log(f"Content cache evicted {evicted} entries", level="info")
+
+
+_content_cache: ContentCache | None = None
+_content_cache_lock = threading.Lock()
+
+
+def get_content_cache() -> ContentCache | None:
+    """Return the process-wide content cache, or None when CONTENT_CACHE_ENABLED=0."""
+    global _content_cache
+    if not CONTENT_CACHE_ENABLED:
+        return None
+    with _content_cache_lock:
+        if _content_cache is None:
+            _content_cache = ContentCache(os.path.join(CACHE_DIR, "content.sqlite3"))
+        return _content_cache
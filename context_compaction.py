@@ -0,0 +1,189 @@
+import functools
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from logger import log
+from tracing import span
+
+# Token budgets for text handed from one agent to the next.
+CONTEXT_BUDGETS = {
+    "search_tools": int(os.getenv("SEARCH_TOOLS_CONTEXT_TOKENS", "1800")),
+    "planner": int(os.getenv("PLANNER_CONTEXT_TOKENS", "1200")),
+    "meme_notes": int(os.getenv("MEME_NOTES_CONTEXT_TOKENS", "600")),
+}
+PASSAGE_MAX_TOKENS = 120
+# Passages whose word-trigram sets overlap at least this much are treated as duplicates.
+DUPLICATE_JACCARD = 0.6
+URL_PATTERN = re.compile(r"https?://\S+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in is it its of on or that the this to was were what when "
+    "which who why will with you your not no can more than into about over after".split()
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _tokenizer():
+    """cl100k_base from the copy bundled with LiteLLM, so counting works offline."""
+    try:
+        from litellm.litellm_core_utils.default_encoding import encoding
+
+        return encoding
+    except Exception as e:
+        log(f"Tokenizer unavailable ({e}); estimating tokens from length", level="warning")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _tokenizer()
+    if tokenizer is None:
+        return math.ceil(len(text) / 4)
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def _terms(text: str) -> list[str]:
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def _trigrams(text: str) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)} or {tuple(words)}
+
+
+def split_passages(text: str, max_tokens: int = PASSAGE_MAX_TOKENS) -> list[str]:
+    """Paragraphs (or lines), with long ones cut at sentence boundaries into ~max_tokens pieces."""
+    passages = []
+    for block in re.split(r"\n\s*\n|\n(?=\s*(?:[-*•]|\d+[.)])\s)", text):
+        block = block.strip()
+        if not block:
+            continue
+        if count_tokens(block) <= max_tokens:
+            passages.append(block)
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", block):
+            candidate = f"{current} {sentence}".strip()
+            if current and count_tokens(candidate) > max_tokens:
+                passages.append(current)
+                current = sentence
+            else:
+                current = candidate
+        if current:
+            passages.append(current)
+    return passages
+
+
+@dataclass
+class Passage:
+    doc: int
+    position: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+@dataclass
+class CompactionResult:
+    texts: list[str]
+    tokens_before: int
+    tokens_after: int
+    duplicates_dropped: int
+    passages_dropped: int
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(text for text in self.texts if text)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _score(passages: list[Passage], query: str) -> None:
+    """BM25-style relevance to the query, plus a small bonus for early passages and cited sources."""
+    query_terms = set(_terms(query))
+    doc_terms = [Counter(_terms(p.text)) for p in passages]
+    avg_len = sum(sum(terms.values()) for terms in doc_terms) / max(1, len(passages)) or 1.0
+    for passage, terms in zip(passages, doc_terms):
+        length = sum(terms.values()) or 1
+        score = 0.0
+        for term in query_terms:
+            if term not in terms:
+                continue
+            df = sum(1 for other in doc_terms if term in other)
+            idf = math.log(1 + (len(passages) - df + 0.5) / (df + 0.5))
+            tf = terms[term]
+            score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / avg_len))
+        score += 0.5 / (1 + passage.position)
+        if URL_PATTERN.search(passage.text):
+            score += 1.0  # keep source links available for citation
+        passage.score = score
+
+
+def compact_documents(documents: list[str | None], query: str, budget: int, label: str) -> CompactionResult:
+    """
+    Fit several texts into one token budget: split them into passages, drop passages that
+    repeat earlier ones (exact or near-duplicate), then keep the passages most relevant to
+    `query` until `budget` tokens are used. Kept passages stay in their original order, and
+    each input document maps to one output text ("" if nothing of it was kept).
+    """
+    with span("context.compact", label=label, budget=budget) as compact_span:
+        passages: list[Passage] = []
+        seen: list[set] = []
+        duplicates = 0
+        tokens_before = 0
+        for doc, text in enumerate(documents):
+            if not text:
+                continue
+            tokens_before += count_tokens(text)
+            for position, passage_text in enumerate(split_passages(text)):
+                shingles = _trigrams(passage_text)
+                if any(len(shingles & other) / len(shingles | other) >= DUPLICATE_JACCARD for other in seen):
+                    duplicates += 1
+                    continue
+                seen.append(shingles)
+                passages.append(Passage(doc, position, passage_text, count_tokens(passage_text)))
+
+        _score(passages, query)
+        kept: set[int] = set()
+        used = 0
+        for idx in sorted(range(len(passages)), key=lambda i: passages[i].score, reverse=True):
+            if used + passages[idx].tokens <= budget:
+                kept.add(idx)
+                used += passages[idx].tokens
+
+        texts = [
+            "\n\n".join(p.text for idx, p in enumerate(passages) if idx in kept and p.doc == doc)
+            for doc in range(len(documents))
+        ]
+        result = CompactionResult(
+            texts=texts,
+            tokens_before=tokens_before,
+            tokens_after=sum(count_tokens(text) for text in texts if text),
+            duplicates_dropped=duplicates,
+            passages_dropped=len(passages) - len(kept),
+        )
+        compact_span.set(
+            tokens_before=result.tokens_before,
+            tokens_after=result.tokens_after,
+            tokens_saved=result.tokens_saved,
+            duplicates_dropped=duplicates,
+            passages_dropped=result.passages_dropped,
+        )
+    if result.tokens_saved > 0:
+        log(
+            f"Compacted {label}: {result.tokens_before} -> {result.tokens_after} tokens "
+            f"({duplicates} duplicate and {result.passages_dropped} low-relevance passages dropped)",
+            level="info",
+        )
+    return result
+
+
+def compact_text(text: str, query: str, label: str, budget: int | None = None) -> str:
+    """Compact one text to the budget configured for `label` in CONTEXT_BUDGETS."""
+    budget = CONTEXT_BUDGETS[label] if budget is None else budget
+    if count_tokens(text) <= budget:
+        return text
+    return compact_documents([text], query, budget, label).text
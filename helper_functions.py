@@ -1,10 +1,19 @@
-import time
-import requests
-from readability import Document as ReadabilityDocument
-from bs4 import BeautifulSoup
-from newspaper import Article
-from newspaper import Config
+import asyncio
+import copy
+import functools
+import os
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Callable
+from urllib.parse import urlparse
+
+import httpx
+import lxml.html
+from content_cache import CachedPage, get_content_cache, normalize_url
+from html_stream import HtmlStreamDecoder, is_html_content_type
+from http_client import get_async_client, get_client
 from logger import log
+from tracing import annotate, traced
 
 
 HEADERS = {
@@ -14,58 +23,215 @@ HEADERS = {
 }
 
 MAX_HTML_BYTES = 750_000
+# Smaller reads let the streaming parser notice a closed article before the rest arrives.
+STREAM_CHUNK_BYTES = 16 * 1024
 MAX_ARTICLE_CHARS = 2500
 REQUEST_TIMEOUT = 10
+MAX_CONCURRENT_EXTRACTIONS = 6
+MAX_REQUESTS_PER_HOST = 2
+# "lxml" parses each page once into a tree shared by the extractors; "html.parser" is the
+# original BeautifulSoup path, kept for comparison (see benchmarks/extractors.py).
+HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "lxml")
+NOISY_TAGS = {"script", "style", "nav", "footer", "header", "aside"}
 
 def clamp_text(text: str | None, limit: int = MAX_ARTICLE_CHARS) -> str | None:
     if text and len(text) > limit:
         return text[:limit]
     return text
 
-def fetch_html(url: str, max_bytes: int = MAX_HTML_BYTES) -> tuple[str | None, str | None]:
+@dataclass
+class FetchedDocument:
+    """A single downloaded page shared by every extractor in the chain."""
+    url: str
+    raw: bytes = b""
+    encoding: str = "utf-8"
+    status_code: int | None = None
+    error_code: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    # Filled in by the streaming fetch, which parses while downloading.
+    parsed: lxml.html.HtmlElement | None = field(default=None, repr=False)
+    # Reading stopped at the closed article (HTML_EARLY_STOP); such pages are not cached.
+    truncated: bool = False
+
+    @cached_property
+    def html(self) -> str | None:
+        if self.error_code or not self.raw:
+            return None
+        return self.raw.decode(self.encoding, errors="replace")
+
+    @cached_property
+    def tree(self) -> lxml.html.HtmlElement | None:
+        """Parsed lxml tree, built once on first use (lxml backend only)."""
+        if HTML_PARSER_BACKEND != "lxml" or not self.html:
+            return None
+        if self.parsed is not None:
+            return self.parsed
+        return parse_html(self.html)
+
+
+def parse_html(html: str) -> lxml.html.HtmlElement:
+    return lxml.html.document_fromstring(html)
+
+
+def tree_text(root: lxml.html.HtmlElement, skip_tags: set[str] = frozenset()) -> str:
+    """
+    Text of a tree as newline-separated stripped strings (like BeautifulSoup's
+    get_text(separator="\n", strip=True)), skipping comments and `skip_tags` subtrees
+    without mutating the shared tree.
+    """
+    parts: list[str] = []
+
+    def add(value: str | None) -> None:
+        if value and (value := value.strip()):
+            parts.append(value)
+
+    def walk(element) -> None:
+        # Comments and processing instructions have a non-string tag; their tails still count.
+        if not isinstance(element.tag, str) or element.tag in skip_tags:
+            return
+        add(element.text)
+        for child in element:
+            walk(child)
+            add(child.tail)
+
+    walk(root)
+    return "\n".join(parts)
+
+
+# newspaper, readability and bs4 add ~0.5s to startup, so each is imported on first use.
+@functools.cache
+def _readability_document(shared_tree: bool) -> type:
+    from readability import Document
+
+    if not shared_tree:
+        return Document
+
+    class SharedTreeReadability(Document):
+        """Readability mutates the tree it scores (and re-parses on retries); give it a fresh copy each time."""
+
+        def _parse(self, input):
+            return super()._parse(copy.deepcopy(input))
+
+    return SharedTreeReadability
+
+
+def _fetched(document: FetchedDocument) -> FetchedDocument:
+    annotate(http_status=document.status_code, bytes=len(document.raw), error_code=document.error_code)
+    return document
+
+
+def _unusable_response(url: str, response: httpx.Response) -> FetchedDocument | None:
+    """Document for a response whose body is not worth reading, or None to stream it."""
+    if response.status_code == 304:
+        return FetchedDocument(url, status_code=304)
+    if response.status_code == 403:
+        return FetchedDocument(url, status_code=403, error_code="FORBIDDEN")
+    if response.status_code == 404:
+        return FetchedDocument(url, status_code=404, error_code="NOT_FOUND")
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type")
+    if not is_html_content_type(content_type):
+        log(f"Skipping {url}: not HTML ({content_type})", level="warning")
+        return FetchedDocument(url, status_code=response.status_code, error_code="UNSUPPORTED_CONTENT_TYPE")
+    return None
+
+
+def _stream_decoder(response: httpx.Response, max_bytes: int) -> HtmlStreamDecoder:
+    return HtmlStreamDecoder(response.charset_encoding, max_bytes=max_bytes, build_tree=HTML_PARSER_BACKEND == "lxml")
+
+
+def _streamed_document(url: str, response: httpx.Response, decoder: HtmlStreamDecoder) -> FetchedDocument:
+    raw, tree = decoder.close()
+    annotate(encoding=decoder.encoding, stopped=decoder.stop_reason or "eof")
+    return FetchedDocument(
+        url,
+        raw=raw,
+        encoding=decoder.document_encoding or "utf-8",
+        status_code=response.status_code,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        parsed=tree,
+        truncated=decoder.truncated,
+    )
+
+
+@traced("http.fetch")
+def fetch_document(
+    url: str,
+    max_bytes: int = MAX_HTML_BYTES,
+    extra_headers: dict[str, str] | None = None,
+) -> FetchedDocument:
+    """
+    Download a page, decoding and parsing it as chunks arrive (see html_stream). Non-HTML
+    responses are rejected from their headers, and reading stops at `max_bytes` or as soon
+    as the article or body has closed.
+    """
+    log(f"Fetching HTML from {url}")
+    annotate(url=url)
+    try:
+        headers = {**HEADERS, **(extra_headers or {})}
+        with get_client().stream("GET", url, headers=headers, timeout=15) as response:
+            if (document := _unusable_response(url, response)) is not None:
+                return _fetched(document)
+            decoder = _stream_decoder(response, max_bytes)
+            for chunk in response.iter_bytes(chunk_size=STREAM_CHUNK_BYTES):
+                if decoder.feed(chunk):
+                    break
+            return _fetched(_streamed_document(url, response, decoder))
+    except httpx.TimeoutException:
+        return _fetched(FetchedDocument(url, error_code="TIMEOUT"))
+    except httpx.HTTPError:
+        return _fetched(FetchedDocument(url, error_code="NETWORK_ERROR"))
+
+
+@traced("http.fetch")
+async def afetch_document(
+    url: str,
+    max_bytes: int = MAX_HTML_BYTES,
+    extra_headers: dict[str, str] | None = None,
+) -> FetchedDocument:
+    """Async counterpart of fetch_document using the shared httpx client."""
     log(f"Fetching HTML from {url}")
+    annotate(url=url)
     try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        if response.status_code == 403:
-            return None, "FORBIDDEN"
-        if response.status_code == 404:
-            return None, "NOT_FOUND"
-        response.raise_for_status()
-        chunks = []
-        total = 0
-        for chunk in response.iter_content(chunk_size=64 * 1024):
-            if not chunk:
-                continue
-            chunks.append(chunk)
-            total += len(chunk)
-            if total >= max_bytes:
-                break
-
-        raw = b"".join(chunks)
-
-        # Best-effort decode (requests may not know encoding yet because we stopped early)
-        encoding = response.encoding or "utf-8"
-        html = raw.decode(encoding, errors="replace")
-        return html, None
-    except requests.Timeout:
-        return None, "TIMEOUT"
-    except requests.RequestException:
-        return None, "NETWORK_ERROR"
-
-
-def extract_article_text_newspaper(url: str) -> str | None:
+        headers = {**HEADERS, **(extra_headers or {})}
+        async with get_async_client().stream("GET", url, headers=headers, timeout=15) as response:
+            if (document := _unusable_response(url, response)) is not None:
+                return _fetched(document)
+            decoder = _stream_decoder(response, max_bytes)
+            async for chunk in response.aiter_bytes(chunk_size=STREAM_CHUNK_BYTES):
+                if decoder.feed(chunk):
+                    break
+            return _fetched(_streamed_document(url, response, decoder))
+    except httpx.TimeoutException:
+        return _fetched(FetchedDocument(url, error_code="TIMEOUT"))
+    except httpx.HTTPError:
+        return _fetched(FetchedDocument(url, error_code="NETWORK_ERROR"))
+
+
+def fetch_html(url: str, max_bytes: int = MAX_HTML_BYTES) -> tuple[str | None, str | None]:
+    document = fetch_document(url, max_bytes=max_bytes)
+    return document.html, document.error_code
+
+
+def extract_article_text_newspaper(url: str, html: str | None = None) -> str | None:
     """Extract main article text from a given URL and is optimized for news articles and blog posts.
+    Pass already-fetched `html` to avoid a second download.
     It returns None if extraction fails or the extracted content is too short."""
     log(f"Extracting content with Newspaper3k from {url}")
 
-    html, err = fetch_html(url)
-    if err == "FORBIDDEN":
-        log(f"Newspaper3k skipped (FORBIDDEN): {url}", level="warning")
-        return None
-    if not html:
-        log(f"Newspaper3k skipped (fetch error: {err}): {url}", level="warning")
-        return None
+    if html is None:
+        html, err = fetch_html(url)
+        if err == "FORBIDDEN":
+            log(f"Newspaper3k skipped (FORBIDDEN): {url}", level="warning")
+            return None
+        if not html:
+            log(f"Newspaper3k skipped (fetch error: {err}): {url}", level="warning")
+            return None
     try:
+        from newspaper import Article, Config
+
         config = Config()
         config.browser_user_agent = HEADERS["User-Agent"]
         config.request_timeout = REQUEST_TIMEOUT
@@ -85,18 +251,27 @@ def extract_article_text_newspaper(url: str) -> str | None:
         log(f"Error extracting content with Newspaper3k: {e}", level="error")
         return None
 
-def extract_article_text_readability(html: str) -> str | None:
+def extract_article_text_readability(html: str, tree: lxml.html.HtmlElement | None = None) -> str | None:
     """Extract content from HTML by removing unnecessary elements and returning main content
+    Pass an already-parsed `tree` to skip re-parsing with the lxml backend.
     It returns None if the extracted content is too short."""
     log(f"Extracting content with Readability")
     try:
-        doc = ReadabilityDocument(html)
+        if HTML_PARSER_BACKEND == "lxml":
+            doc = _readability_document(True)(tree if tree is not None else parse_html(html))
+        else:
+            doc = _readability_document(False)(html)
         summary = doc.summary()
         if not summary:
             log("Readability extraction failed: No summary found", level="warning")
             return None
-        soup = BeautifulSoup(summary, 'html.parser')
-        text = soup.get_text(separator="\n", strip=True)
+        if HTML_PARSER_BACKEND == "lxml":
+            text = tree_text(lxml.html.fromstring(summary))
+        else:
+            from bs4 import BeautifulSoup
+
+            soup = BeautifulSoup(summary, 'html.parser')
+            text = soup.get_text(separator="\n", strip=True)
         if len(text) > 200:
             log("Readability extraction successful", level="success")
             return text
@@ -106,18 +281,24 @@ def extract_article_text_readability(html: str) -> str | None:
         log(f"Error extracting content with Readability: {e}", level="error")
         return None
 
-def extract_visible_text_html(html: str) -> str | None:
+def extract_visible_text_html(html: str, tree: lxml.html.HtmlElement | None = None) -> str | None:
     """A fallback method that removes common non-content tags and returns clean visible text from HTML. 
+    Pass an already-parsed `tree` to skip re-parsing with the lxml backend.
     Returns None if content is too short or extraction fails."""
     log(f"Extracting content with Plain HTML")
     try:
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Remove noisy elements
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
-            
-        text = soup.get_text(separator="\n", strip=True)
+        if HTML_PARSER_BACKEND == "lxml":
+            text = tree_text(tree if tree is not None else parse_html(html), skip_tags=NOISY_TAGS)
+        else:
+            from bs4 import BeautifulSoup
+
+            soup = BeautifulSoup(html, 'html.parser')
+
+            # Remove noisy elements
+            for tag in soup(list(NOISY_TAGS)):
+                tag.decompose()
+
+            text = soup.get_text(separator="\n", strip=True)
         # Filter lines that look like main content (longer lines)
         lines = [line.strip() for line in text.splitlines() if len(line.strip()) > 50]
         content = "\n".join(lines)
@@ -131,42 +312,246 @@ def extract_visible_text_html(html: str) -> str | None:
         log(f"Error extracting content with Plain HTML: {e}", level="error")
         return None
 
+def _extract_with_newspaper(document: FetchedDocument) -> str | None:
+    return extract_article_text_newspaper(document.url, html=document.html)
+
+
+def _extract_with_readability(document: FetchedDocument) -> str | None:
+    return extract_article_text_readability(document.html, tree=document.tree)
+
+
+def _extract_with_visible_text(document: FetchedDocument) -> str | None:
+    return extract_visible_text_html(document.html, tree=document.tree)
+
+
+# Ordered from most to least precise; every strategy reads the same FetchedDocument.
+EXTRACTION_CHAIN = [
+    ("newspaper", _extract_with_newspaper),
+    ("readability", _extract_with_readability),
+    ("visible_text", _extract_with_visible_text),
+]
+
+
+@traced("article.extractors")
+def extract_document_text(document: FetchedDocument) -> tuple[str | None, str | None]:
+    """Run the extraction chain over one fetched document.
+    Returns the clamped text and the name of the extractor that produced it."""
+    for name, extractor in EXTRACTION_CHAIN:
+        try:
+            text = extractor(document)
+            if text:
+                log(f"Successfully extracted {len(text)} chars using {name}", level="success")
+                annotate(extractor=name, chars=len(text))
+                return clamp_text(text), name
+        except Exception as e:
+            log(f"{name} extractor failed: {e}", level="error")
+
+    log(f"All extraction methods failed for url: {document.url}", level="error")
+    return None, None
+
+
+def _cached_page(url: str) -> CachedPage | None:
+    cache = get_content_cache()
+    return cache.get(url) if cache else None
+
+
+def _store_extraction(document: FetchedDocument, extractor: str | None, text: str | None) -> None:
+    cache = get_content_cache()
+    if document.truncated:
+        log(f"Not caching {document.url}: read stopped early at the article", level="debug")
+        return
+    if cache and text:
+        cache.put(
+            document.url,
+            document.raw,
+            document.encoding,
+            extractor,
+            text,
+            etag=document.etag,
+            last_modified=document.last_modified,
+        )
+
+
+def _revalidated_text(cached: CachedPage, document: FetchedDocument) -> str | None:
+    """Return the cached text if the server confirmed it is unchanged (304)."""
+    if document.status_code != 304:
+        return None
+    get_content_cache().touch(cached.url)
+    log(f"Content cache revalidated for {cached.url} ({cached.extractor})", level="success")
+    annotate(cache="revalidated", extractor=cached.extractor)
+    return cached.text
+
+
+@traced("article.extract")
 def extract_content_text(url: str) -> str | None:
     """
-    Attempt multiple extraction methods sequentially until one succeeds.
+    Fetch the page once, then attempt multiple extraction methods sequentially until one succeeds.
+    Fresh results are served from the content cache without touching the network;
+    stale entries are revalidated with ETag/Last-Modified when the server provided them.
     Gracefully handles blocked or inaccessible pages.
     """
     log(f"Starting extraction process for: {url}", level="info")
+    annotate(url=url)
 
-    text = extract_article_text_newspaper(url)
-    if text:
+    cached = _cached_page(url)
+    if cached and cached.is_fresh(get_content_cache().ttl):
+        log(f"Content cache hit for {url} ({cached.extractor})", level="success")
+        annotate(cache="hit", extractor=cached.extractor)
+        return cached.text
+
+    document = fetch_document(url, extra_headers=cached.validators() if cached else None)
+    if cached and (text := _revalidated_text(cached, document)):
         return text
 
-    html, error_code = fetch_html(url)
+    if document.error_code == "FORBIDDEN":
+        log(f"Access forbidden for {url}. Skipping HTML-based extractors.", level="warning")
+        return None
+
+    if not document.html:
+        log(f"Failed to fetch HTML for {url}. Error: {document.error_code}", level="error")
+        return None
+
+    text, extractor = extract_document_text(document)
+    annotate(cache="miss", extractor=extractor)
+    _store_extraction(document, extractor, text)
+    return text
 
-    if error_code == "FORBIDDEN":
+
+@traced("article.extract")
+async def aextract_content_text(url: str) -> str | None:
+    """
+    Async counterpart of extract_content_text. The download is awaited on the shared
+    client and the CPU-bound extractor chain runs in a worker thread.
+    """
+    log(f"Starting extraction process for: {url}", level="info")
+    annotate(url=url)
+
+    cached = _cached_page(url)
+    if cached and cached.is_fresh(get_content_cache().ttl):
+        log(f"Content cache hit for {url} ({cached.extractor})", level="success")
+        annotate(cache="hit", extractor=cached.extractor)
+        return cached.text
+
+    document = await afetch_document(url, extra_headers=cached.validators() if cached else None)
+    if cached and (text := _revalidated_text(cached, document)):
+        return text
+
+    if document.error_code == "FORBIDDEN":
         log(f"Access forbidden for {url}. Skipping HTML-based extractors.", level="warning")
         return None
 
-    if not html:
-        log(f"Failed to fetch HTML for {url}. Error: {error_code}", level="error")
+    if not document.html:
+        log(f"Failed to fetch HTML for {url}. Error: {document.error_code}", level="error")
         return None
 
-    for extractor in [
-        extract_article_text_readability,
-        extract_visible_text_html
-    ]:
-        try:
-            text = extractor(html)
-            if text:
-                log(f"Successfully extracted {len(text)} chars using {extractor.__name__}", level="success")
-                return clamp_text(text)
-            time.sleep(0.5)
-        except Exception as e:
-            log(f"{extractor.__name__} failed: {e}", level="error")
+    text, extractor = await asyncio.to_thread(extract_document_text, document)
+    annotate(cache="miss", extractor=extractor)
+    _store_extraction(document, extractor, text)
+    return text
 
-    log(f"All extraction methods failed for url: {url}", level="error")
-    return None
 
+# In-flight extractions keyed by (event loop, normalized URL) -> [task, waiter count].
+_inflight_extractions: dict[tuple[int, str], list] = {}
+
+
+async def shared_extract_content_text(url: str) -> str | None:
+    """
+    aextract_content_text, deduplicated across concurrent callers: workflows that
+    surface the same article (e.g. a batch of overlapping topics) share one fetch and
+    extraction. The underlying task is only cancelled once every waiter has gone.
+    """
+    key = (id(asyncio.get_running_loop()), normalize_url(url))
+    entry = _inflight_extractions.get(key)
+    if entry is None:
+        task = asyncio.create_task(aextract_content_text(url))
+        entry = _inflight_extractions[key] = [task, 0]
 
+        def forget(done: asyncio.Task) -> None:
+            if _inflight_extractions.get(key, [None])[0] is done:
+                del _inflight_extractions[key]
+
+        task.add_done_callback(forget)
+    else:
+        log(f"Joining in-flight extraction for {url}", level="info")
+    entry[1] += 1
+    try:
+        return await asyncio.shield(entry[0])
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not entry[0].done():
+            entry[0].cancel()
+
+
+def _first_successes(
+    results: list[str | None],
+    done: list[bool],
+    limit: int,
+    accept: Callable[[int], bool] | None = None,
+    checked: list[bool] | None = None,
+) -> list[int] | None:
+    """Indexes of the first `limit` successful results in rank order, or None while
+    a higher-ranked candidate is still pending and could change the answer.
+    `accept(idx)` is asked once per result, in rank order; rejected results are dropped."""
+    selected = []
+    for idx, finished in enumerate(done):
+        if not finished:
+            return None
+        if results[idx] and accept is not None and not checked[idx]:
+            checked[idx] = True
+            if not accept(idx):
+                results[idx] = None
+        if results[idx]:
+            selected.append(idx)
+            if len(selected) >= limit:
+                return selected
+    return selected
+
+
+async def extract_many(
+    urls: list[str | None],
+    limit: int,
+    max_concurrency: int = MAX_CONCURRENT_EXTRACTIONS,
+    per_host: int = MAX_REQUESTS_PER_HOST,
+    accept: Callable[[str, str], bool] | None = None,
+) -> list[tuple[int, str]]:
+    """
+    Extract content for ranked candidate URLs concurrently.
+    Returns (index, text) pairs for the first `limit` successful URLs in their
+    original rank order; stragglers are cancelled once that set is known.
+    `accept(url, text)` can reject a result (e.g. a duplicate story); the next
+    candidate then takes its slot. It is called in rank order.
+    """
+    candidates = [(idx, url) for idx, url in enumerate(urls) if url]
+    if not candidates or limit <= 0:
+        return []
+
+    global_slots = asyncio.Semaphore(max_concurrency)
+    host_slots = {urlparse(url).netloc: asyncio.Semaphore(per_host) for _, url in candidates}
+
+    async def run(url: str) -> str | None:
+        async with global_slots, host_slots[urlparse(url).netloc]:
+            return await shared_extract_content_text(url)
+
+    results: list[str | None] = [None] * len(candidates)
+    done = [False] * len(candidates)
+    checked = [False] * len(candidates)
+    accept_result = (lambda pos: accept(candidates[pos][1], results[pos])) if accept else None
+    selected = None
+    tasks = {asyncio.create_task(run(url)): pos for pos, (_, url) in enumerate(candidates)}
+    pending = set(tasks)
+    try:
+        while pending and selected is None:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                pos = tasks[task]
+                try:
+                    results[pos] = task.result()
+                except Exception as e:
+                    log(f"Extraction failed for {candidates[pos][1]}: {e}", level="error")
+                done[pos] = True
+            selected = _first_successes(results, done, limit, accept_result, checked)
+    finally:
+        for task in pending:
+            task.cancel()
 
+    return [(candidates[pos][0], results[pos]) for pos in selected or []]
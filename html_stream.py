@@ -0,0 +1,167 @@
+import codecs
+import os
+import re
+
+import lxml.etree
+import lxml.html
+
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+# The HTML spec has browsers look for <meta charset> in the first 1024 bytes.
+META_SNIFF_BYTES = 1024
+# Opt-in: stop reading once the story's <article>/<main> (one holding the page's <h1> and at
+# least this much text) has closed. Off by default, since a cut-short page can lose the story.
+ARTICLE_MIN_CHARS = int(os.getenv("HTML_ARTICLE_MIN_CHARS", "400"))
+HTML_EARLY_STOP = os.getenv("HTML_EARLY_STOP", "0") == "1"
+# Teaser and "related" cards are often <article>s too; they never end the read.
+BOILERPLATE_TAGS = {"aside", "nav", "header", "footer"}
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+# Codecs that skip the byte order mark when the whole body is decoded in one go.
+BOM_CODECS = {"utf-8": "utf-8-sig", "utf-16-le": "utf-16", "utf-16-be": "utf-16"}
+META_CHARSET = re.compile(
+    rb"""<meta[^>]+?charset\s*=\s*["']?\s*([a-zA-Z0-9_:.-]+)""",
+    re.IGNORECASE,
+)
+
+
+def is_html_content_type(content_type: str | None) -> bool:
+    """True for HTML/XHTML, and for a missing header (many servers omit it)."""
+    if not content_type:
+        return True
+    return content_type.split(";", 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def _codec(name: str | None) -> str | None:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.decode("ascii", "ignore") if isinstance(name, bytes) else name).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(head: bytes, header_charset: str | None = None) -> tuple[str, int]:
+    """
+    Encoding of a page from its first bytes, in the HTML spec's order: byte order mark,
+    Content-Type charset, <meta> charset, then UTF-8. Returns (codec name, BOM length).
+    """
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name, len(bom)
+    if encoding := _codec(header_charset):
+        return encoding, 0
+    if match := META_CHARSET.search(head[:META_SNIFF_BYTES]):
+        if encoding := _codec(match.group(1)):
+            # A UTF-16 declaration inside an ASCII-compatible byte stream is always wrong.
+            return ("utf-8" if encoding.startswith("utf-16") else encoding), 0
+    return "utf-8", 0
+
+
+def _is_story(element: lxml.html.HtmlElement) -> bool:
+    """An article/main with the headline and real text, outside any sidebar or promo block."""
+    if any(ancestor.tag in BOILERPLATE_TAGS for ancestor in element.iterancestors()):
+        return False
+    if element.find(".//h1") is None:
+        return False
+    return len(element.text_content()) >= ARTICLE_MIN_CHARS
+
+
+class HtmlStreamDecoder:
+    """
+    Incremental decode + parse of an HTML response body. feed() takes raw chunks as they
+    arrive and, when `build_tree`, decodes them with an incremental decoder (so a multi-byte
+    character split across chunks or cut by the size limit is never mangled) into an lxml
+    pull parser. Only the raw bytes and the tree are kept: decoded text goes straight to the
+    parser, and callers decode the raw bytes with `document_encoding` if they need the HTML
+    string. It reports when reading can stop: the byte limit was reached, the body closed,
+    or (with `early_stop`) the story's article element closed.
+    """
+
+    def __init__(
+        self,
+        header_charset: str | None = None,
+        max_bytes: int | None = None,
+        build_tree: bool = True,
+        early_stop: bool = HTML_EARLY_STOP,
+    ):
+        self.header_charset = header_charset
+        self.max_bytes = max_bytes
+        self.early_stop = early_stop
+        self.encoding: str | None = None
+        self.bytes_read = 0
+        self.stop_reason: str | None = None
+        self._raw: list[bytes] = []
+        self._bom_length = 0
+        self._fed = False
+        self._decoder = None
+        self._parser = None
+        if build_tree:
+            self._parser = lxml.etree.HTMLPullParser(events=("end",), tag=("article", "main", "body"))
+            self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+
+    @property
+    def done(self) -> bool:
+        return self.stop_reason is not None
+
+    @property
+    def truncated(self) -> bool:
+        """True when reading stopped before the end of the page on the article heuristic."""
+        return self.stop_reason == "article_closed"
+
+    def feed(self, chunk: bytes) -> bool:
+        """Consume one chunk; returns True once the caller should stop reading."""
+        if self.done or not chunk:
+            return self.done
+        if self.max_bytes is not None and self.bytes_read + len(chunk) >= self.max_bytes:
+            chunk = chunk[: self.max_bytes - self.bytes_read]
+            self.stop_reason = "max_bytes"
+        self.bytes_read += len(chunk)
+        self._raw.append(chunk)
+
+        if self.encoding is None:
+            self.encoding, self._bom_length = sniff_encoding(chunk, self.header_charset)
+            if self._parser is not None:
+                self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+            chunk = chunk[self._bom_length:]
+        if self._decoder is not None:
+            self._push(self._decoder.decode(chunk))
+        return self.done
+
+    @property
+    def document_encoding(self) -> str | None:
+        """Codec that decodes the raw bytes read so far to the text the parser saw, skipping any BOM."""
+        if self.encoding and self._bom_length:
+            return BOM_CODECS.get(self.encoding, self.encoding)
+        return self.encoding
+
+    def _push(self, text: str) -> None:
+        if not text:
+            return
+        self._fed = True
+        self._parser.feed(text)
+        for _, element in self._parser.read_events():
+            if self.done:
+                continue
+            if element.tag == "body":
+                self.stop_reason = "body_closed"
+            elif self.early_stop and _is_story(element):
+                self.stop_reason = "article_closed"
+
+    def close(self) -> tuple[bytes, lxml.html.HtmlElement | None]:
+        """Flush the decoder and parser; returns (raw bytes read, tree or None)."""
+        tree = None
+        if self._decoder is not None:
+            tail = self._decoder.decode(b"", final=True)
+            if tail:
+                self._push(tail)
+            if self._fed:
+                try:
+                    tree = self._parser.close()
+                except lxml.etree.XMLSyntaxError:
+                    tree = None
+        raw, self._raw = b"".join(self._raw), []
+        return raw, tree
@@ -0,0 +1,422 @@
+import asyncio
+import importlib.util
+import ipaddress
+import os
+import socket
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Any, AsyncIterator, Callable, Iterator
+from urllib.request import getproxies
+
+import httpcore
+import httpx
+
+from logger import log
+
+DEFAULT_TIMEOUT = 15
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST_CONNECTIONS = int(os.getenv("HTTP_PER_HOST_CONNECTIONS", "6"))
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "300"))
+# HTTP/2 is opt-in: it needs HTTP2_ENABLED=1 and the optional `h2` package (pip install "httpx[http2]"),
+# which is not a project dependency. Otherwise every client speaks HTTP/1.1 with keep-alive.
+HTTP2_REQUESTED = os.getenv("HTTP2_ENABLED", "0") == "1"
+HTTP2_ENABLED = HTTP2_REQUESTED and importlib.util.find_spec("h2") is not None
+if HTTP2_REQUESTED and not HTTP2_ENABLED:
+    log('HTTP2_ENABLED=1 but the h2 package is not installed (pip install "httpx[http2]"); using HTTP/1.1', level="warning")
+
+
+class _ConnectionStats:
+    """Per-host counters: requests, new TCP connections, TLS handshakes and DNS cache use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "connections": 0, "tls_handshakes": 0, "http2_requests": 0, "dns_hits": 0, "dns_misses": 0}
+        )
+
+    def count(self, host: str, field: str) -> None:
+        with self._lock:
+            self._hosts[host][field] += 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                host: {**counts, "reused": max(0, counts["requests"] - counts["connections"])}
+                for host, counts in self._hosts.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+_stats = _ConnectionStats()
+
+
+def connection_stats() -> dict[str, dict[str, int]]:
+    """Per-host request/connection counters for every shared client; `reused` requests skipped the handshake."""
+    return _stats.snapshot()
+
+
+def reset_connection_stats() -> None:
+    _stats.clear()
+
+
+def _trace_event(host: str, event: str) -> None:
+    if event == "connection.connect_tcp.complete":
+        _stats.count(host, "connections")
+    elif event == "connection.start_tls.complete":
+        _stats.count(host, "tls_handshakes")
+    elif event == "http2.send_request_headers.started":
+        _stats.count(host, "http2_requests")
+
+
+class _DnsCache:
+    """getaddrinfo results kept for DNS_CACHE_TTL seconds, shared by sync and async clients."""
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, int], tuple[float, list[str]]] = {}
+
+    def get(self, host: str, port: int) -> list[str] | None:
+        with self._lock:
+            entry = self._entries.get((host, port))
+        if entry is None or entry[0] < time.monotonic():
+            _stats.count(host, "dns_misses")
+            return None
+        _stats.count(host, "dns_hits")
+        return entry[1]
+
+    def put(self, host: str, port: int, infos: list) -> list[str]:
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[(host, port)] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host: str, port: int) -> None:
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+_dns_cache = _DnsCache()
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class _CachingAsyncBackend(httpcore.AsyncNetworkBackend):
+    """Resolves through the DNS cache, then connects to the IP (TLS still uses the hostname for SNI)."""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self._backend = backend
+
+    async def connect_tcp(self, host: str, port: int, timeout=None, local_address=None, socket_options=None):
+        if _is_ip(host) or DNS_CACHE_TTL <= 0:
+            return await self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        addresses = _dns_cache.get(host, port)
+        if addresses is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            addresses = _dns_cache.put(host, port, infos)
+        error: Exception | None = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        _dns_cache.forget(host, port)
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+class _CachingSyncBackend(httpcore.NetworkBackend):
+    """Sync counterpart of _CachingAsyncBackend."""
+
+    def __init__(self, backend: httpcore.NetworkBackend):
+        self._backend = backend
+
+    def connect_tcp(self, host: str, port: int, timeout=None, local_address=None, socket_options=None):
+        if _is_ip(host) or DNS_CACHE_TTL <= 0:
+            return self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        addresses = _dns_cache.get(host, port)
+        if addresses is None:
+            addresses = _dns_cache.put(host, port, socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        error: Exception | None = None
+        for address in addresses:
+            try:
+                return self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        _dns_cache.forget(host, port)
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float) -> None:
+        self._backend.sleep(seconds)
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _with_dns_cache(transport: httpx.BaseTransport | httpx.AsyncBaseTransport, sync: bool):
+    """
+    Route the transport's connections through the DNS cache. httpx does not expose the network
+    backend, so this swaps it on the httpcore pool the transport built; if a future httpx/httpcore
+    moves it, the transport is used as is (no DNS cache) rather than failing.
+    """
+    pool = getattr(transport, "_pool", None)
+    backend = getattr(pool, "_network_backend", None)
+    if backend is None:
+        log("DNS cache disabled: this httpx/httpcore version has no pool network backend to wrap", level="warning")
+        return transport
+    pool._network_backend = _CachingSyncBackend(backend) if sync else _CachingAsyncBackend(backend)
+    return transport
+
+
+def _pooled_transport(sync: bool, proxy: str | None = None) -> httpx.BaseTransport | httpx.AsyncBaseTransport:
+    transport_class = httpx.HTTPTransport if sync else httpx.AsyncHTTPTransport
+    return _with_dns_cache(transport_class(limits=_pool_limits(), http2=HTTP2_ENABLED, proxy=proxy), sync)
+
+
+def _network_transports(sync: bool) -> tuple[Any, dict[str, Any]]:
+    """
+    The host-limited default transport plus mounts for the proxies configured in the environment
+    (HTTP(S)_PROXY / ALL_PROXY / NO_PROXY, matched the way httpx does with trust_env), so proxied
+    requests keep the per-host limits and connection_stats as well.
+    """
+    limited = HostLimitedTransport if sync else HostLimitedAsyncTransport
+    direct = limited(_pooled_transport(sync))
+    proxies = getproxies()
+    mounts: dict[str, Any] = {}
+    for scheme in ("all", "http", "https"):
+        if url := proxies.get(scheme):
+            mounts[f"{scheme}://"] = limited(_pooled_transport(sync, proxy=url if "://" in url else f"http://{url}"))
+    for host in (proxies.get("no") or "").split(","):
+        host = host.strip()
+        if host == "*":
+            return direct, {}
+        if host:
+            mounts[f"all://{host}" if _is_ip(host) or host == "localhost" else f"all://*{host}"] = direct
+    return direct, mounts
+
+
+def _once(release: Callable[[], None]) -> Callable[[], None]:
+    released = False
+
+    def release_once() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            release()
+
+    return release_once
+
+
+class _ReleasingAsyncStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = _once(release)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class _ReleasingSyncStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = _once(release)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class HostLimitedAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Caps concurrent requests per host (a response holds its slot until its body is closed)
+    and records connection reuse for connection_stats().
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host: int = HTTP_PER_HOST_CONNECTIONS):
+        self._transport = transport
+        self._per_host = per_host
+        self._slots: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        _stats.count(host, "requests")
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            _trace_event(host, event)
+            if outer_trace is not None:
+                await outer_trace(event, info)
+
+        request.extensions["trace"] = trace
+        slot = self._slots.setdefault(host, asyncio.Semaphore(self._per_host))
+        await slot.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        if response.is_closed:
+            # Responses built from bytes (mock and replay transports) are read up front and never closed again.
+            slot.release()
+        else:
+            response.stream = _ReleasingAsyncStream(response.stream, slot.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HostLimitedTransport(httpx.BaseTransport):
+    """Sync counterpart of HostLimitedAsyncTransport, safe to share across threads."""
+
+    def __init__(self, transport: httpx.BaseTransport, per_host: int = HTTP_PER_HOST_CONNECTIONS):
+        self._transport = transport
+        self._per_host = per_host
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        _stats.count(host, "requests")
+        outer_trace = request.extensions.get("trace")
+
+        def trace(event: str, info: dict[str, Any]) -> None:
+            _trace_event(host, event)
+            if outer_trace is not None:
+                outer_trace(event, info)
+
+        request.extensions["trace"] = trace
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.BoundedSemaphore(self._per_host))
+        slot.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        if response.is_closed:
+            slot.release()
+        else:
+            response.stream = _ReleasingSyncStream(response.stream, slot.release)
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+# httpx pools are tied to the event loop they were created on, so keep one client per loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_async_transport: httpx.AsyncBaseTransport | None = None
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+_transport: httpx.BaseTransport | None = None
+
+
+def set_async_transport(transport: httpx.AsyncBaseTransport | None) -> None:
+    """
+    Route every shared async client through `transport` (e.g. a replay transport for
+    offline benchmarks); None restores the default network transport.
+    """
+    global _async_transport
+    _async_transport = transport
+    _async_clients.clear()
+
+
+def set_transport(transport: httpx.BaseTransport | None) -> None:
+    """Sync counterpart of set_async_transport for the shared Client."""
+    global _client, _transport
+    with _client_lock:
+        _transport = transport
+        _client = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the shared AsyncClient for the running event loop, creating it on first use.
+    All async outbound requests should go through this client so connections are reused.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        if _async_transport is not None:
+            transport, mounts = HostLimitedAsyncTransport(_async_transport), {}
+        else:
+            transport, mounts = _network_transports(sync=False)
+        client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=DEFAULT_TIMEOUT,
+            limits=_pool_limits(),
+            http2=HTTP2_ENABLED,
+            transport=transport,
+            mounts=mounts,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_client() -> httpx.Client:
+    """
+    Return the process-wide sync Client (thread-safe), for code that cannot await:
+    thread-pool extraction, the template catalog refresh and the OTLP exporter.
+    """
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            if _transport is not None:
+                transport, mounts = HostLimitedTransport(_transport), {}
+            else:
+                transport, mounts = _network_transports(sync=True)
+            _client = httpx.Client(
+                follow_redirects=True,
+                timeout=DEFAULT_TIMEOUT,
+                limits=_pool_limits(),
+                http2=HTTP2_ENABLED,
+                transport=transport,
+                mounts=mounts,
+            )
+        return _client
+
+
+async def close_async_client() -> None:
+    """Close the shared client of the running event loop, if one was created."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
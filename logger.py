@@ -1,4 +1,36 @@
-from datetime import datetime
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+# debug < info < success / highlight < warning < error; records below LOG_LEVEL are dropped
+# before the message is built or formatted.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").lower()
+# "console" keeps the colored one-line output; "json" writes one JSON object per line.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "console").lower()
+LOG_PREVIEW_CHARS = int(os.getenv("LOG_PREVIEW_CHARS", "300"))
+
+SUCCESS = 25
+HIGHLIGHT = 26
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "success": SUCCESS,
+    "highlight": HIGHLIGHT,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "off": logging.CRITICAL + 1,
+}
+logging.addLevelName(SUCCESS, "SUCCESS")
+logging.addLevelName(HIGHLIGHT, "HIGHLIGHT")
+
 
 class Colors:
     BLUE = "\033[94m"
@@ -8,24 +40,131 @@ class Colors:
     BOLD = "\033[1m"
     END = "\033[0m"
 
-def log(message: str, level: str = "info"):
+
+def preview(value: Any, limit: int | None = None) -> str:
+    """str(value) cut to `limit` characters (LOG_PREVIEW_CHARS by default), noting how much was dropped."""
+    limit = LOG_PREVIEW_CHARS if limit is None else limit
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}… (+{len(text) - limit} chars)"
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The original colored `[HH:MM:SS] <icon> message` lines, plus any fields as key=value."""
+
+    STYLES = {
+        "info": f"{Colors.BLUE}{{ts}}{Colors.END} ℹ️  {{msg}}",
+        "success": f"{Colors.GREEN}{{ts}} ✅ {{msg}}{Colors.END}",
+        "warning": f"{Colors.YELLOW}{{ts}} ⚠️  {{msg}}{Colors.END}",
+        "error": f"{Colors.RED}{{ts}} ❌ {{msg}}{Colors.END}",
+        "highlight": f"{Colors.BOLD}{Colors.BLUE}{{ts}} ✨ {{msg}}{Colors.END}",
+    }
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={preview(value)}" for key, value in fields.items())
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        ts = f"[{time.strftime('%H:%M:%S', time.localtime(record.created))}]"
+        style = self.STYLES.get(getattr(record, "level_name", ""), "{ts} {msg}")
+        return style.format(ts=ts, msg=message)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": getattr(record, "level_name", record.levelname.lower()),
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            **{key: _jsonable(value) for key, value in (getattr(record, "fields", None) or {}).items()},
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    return preview(value)
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """Hands the record to the listener thread as is; formatting happens there, not on the caller."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_logger = logging.getLogger("brandflow")
+_logger.setLevel(LEVELS.get(LOG_LEVEL, logging.INFO))
+_logger.propagate = False
+_listener: logging.handlers.QueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener() -> None:
+    """Route records through a queue to a background thread that formats and writes them."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else ConsoleFormatter())
+        _logger.addHandler(_EnqueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+
+
+def flush_logs() -> None:
+    """Write out everything still queued and stop the writer thread (it restarts on the next log)."""
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+        if listener is None:
+            return
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+        listener.stop()
+
+
+# Registered once; flush_logs is a no-op while no listener is running.
+atexit.register(flush_logs)
+
+
+@contextmanager
+def log_level(level: str) -> Iterator[None]:
+    """Temporarily change the minimum level, e.g. log_level("off") around a timed benchmark loop."""
+    previous = _logger.level
+    _logger.setLevel(LEVELS[level.lower()])
+    try:
+        yield
+    finally:
+        _logger.setLevel(previous)
+
+
+def log(message: str | Callable[[], str], level: str = "info", exc_info: bool = False, **fields: Any) -> None:
     """
-    Clean, simple logging function with colored output and timestamps.
-    Levels: info, success, warning, error, highlight
+    Log `message` at `level` (debug, info, success, warning, error, highlight).
+    Pass a zero-argument callable to build an expensive message only when the level is enabled;
+    keyword `fields` go into the JSON output (and are previewed on the console).
     """
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    prefix = f"[{timestamp}]"
-    
     level = level.lower()
-    if level == "info":
-        print(f"{Colors.BLUE}{prefix}{Colors.END} ℹ️  {message}")
-    elif level == "success":
-        print(f"{Colors.GREEN}{prefix} ✅ {message}{Colors.END}")
-    elif level == "warning":
-        print(f"{Colors.YELLOW}{prefix} ⚠️  {message}{Colors.END}")
-    elif level == "error":
-        print(f"{Colors.RED}{prefix} ❌ {message}{Colors.END}")
-    elif level == "highlight":
-        print(f"{Colors.BOLD}{Colors.BLUE}{prefix} ✨ {message}{Colors.END}")
-    else:
-        print(f"{prefix} {message}")
+    levelno = LEVELS.get(level, logging.INFO)
+    if not _logger.isEnabledFor(levelno):
+        return
+    if _listener is None:
+        _start_listener()
+    if callable(message):
+        message = message()
+    # Built directly rather than through Logger.log, which walks the stack for a caller we never print.
+    record = _logger.makeRecord(
+        _logger.name, levelno, "", 0, message, (), sys.exc_info() if exc_info else None,
+        extra={"level_name": level, "fields": fields},
+    )
+    _logger.handle(record)
@@ -0,0 +1,378 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Iterator
+from urllib.parse import urlparse
+
+from logger import log
+
+INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+RATE_LIMIT_COOLDOWN_SECONDS = 5.0
+# Concurrency shrinks when the smoothed latency drifts this far above the best seen.
+LATENCY_BACKOFF_FACTOR = 2.0
+LATENCY_SMOOTHING = 0.2
+POLL_INTERVAL_SECONDS = 0.05
+
+
+@dataclass(frozen=True)
+class Limit:
+    """Requests and tokens per minute; None means "not specified", 0 means unlimited."""
+    rpm: float | None = None
+    tpm: float | None = None
+
+
+# Published free-tier ceilings; override with BRANDFLOW_RATE_LIMITS for paid tiers.
+# Model entries win over their provider's entry, and every model gets its own buckets.
+DEFAULT_LIMITS = {
+    "groq": Limit(rpm=30, tpm=6_000),
+    "groq/llama-3.3-70b-versatile": Limit(rpm=30, tpm=12_000),
+    "groq/meta-llama/llama-4-scout-17b-16e-instruct": Limit(rpm=30, tpm=30_000),
+    "groq/moonshotai/kimi-k2-instruct-0905": Limit(rpm=60, tpm=10_000),
+    "gemini": Limit(rpm=15, tpm=250_000),
+}
+
+
+def parse_rate_limits(spec: str | None) -> dict[str, Limit]:
+    """
+    Parse "groq=30:6000,gemini=15" into {key: Limit(rpm, tpm)}. The ":tpm" part is optional;
+    a field left out keeps the key's current value when configured (see RateLimiter.configure).
+    """
+    limits: dict[str, Limit] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.partition("=")
+        rpm, _, tpm = value.partition(":")
+        try:
+            limits[key.strip().lower()] = Limit(rpm=float(rpm) if rpm else None, tpm=float(tpm) if tpm else None)
+        except ValueError:
+            log(f"Ignoring invalid rate limit {item.strip()!r}", level="warning")
+    return limits
+
+
+def provider_for_model(model: str) -> str:
+    """LiteLLM-style "groq/llama-3.3-70b" -> "groq"."""
+    return model.split("/", 1)[0].lower()
+
+
+def provider_for_url(url: str) -> str:
+    """API host -> provider name, e.g. "api.imgflip.com" -> "imgflip"."""
+    host = (urlparse(url).hostname or "").lower()
+    labels = host.split(".")
+    return labels[-2] if len(labels) >= 2 else host
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for 429s from httpx, requests or LiteLLM exceptions."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+def retry_after_seconds(error: BaseException) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute. The level may go negative when a
+    request turns out to use more than was reserved, which delays the next callers."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket, not forever
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+
+def _rebucket(bucket: TokenBucket | None, per_minute: float | None) -> TokenBucket | None:
+    """A bucket for the new rate that keeps what the old one had already handed out."""
+    if not per_minute:
+        return None
+    if bucket is not None and bucket.capacity == per_minute:
+        return bucket
+    new = TokenBucket(per_minute)
+    if bucket is not None:
+        new.take(bucket.capacity - bucket.level, time.monotonic())
+    return new
+
+
+class _KeyState:
+    def __init__(self, key: str, limit: Limit):
+        self.key = key
+        self.limit = limit
+        self.requests = TokenBucket(limit.rpm) if limit.rpm else None
+        self.tokens = TokenBucket(limit.tpm) if limit.tpm else None
+        self.concurrency = float(INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.waiters: deque[int] = deque()
+        self.latency_ewma: float | None = None
+        self.latency_floor: float | None = None
+        self.counts = {"requests": 0, "queued": 0, "rate_limited": 0}
+        self.wait_seconds = 0.0
+
+    def set_limit(self, limit: Limit) -> None:
+        """Swap in new buckets in place, so leases and waiters holding this state stay counted."""
+        self.limit = limit
+        self.requests = _rebucket(self.requests, limit.rpm)
+        self.tokens = _rebucket(self.tokens, limit.tpm)
+
+
+class Lease:
+    """One admitted request; report how it went with finish(), rate_limited() or cancel()."""
+
+    def __init__(self, limiter: "RateLimiter", state: _KeyState | None, reserved_tokens: int):
+        self._limiter = limiter
+        self._state = state
+        self.reserved_tokens = reserved_tokens
+        self.started = time.monotonic()
+        self.done = False
+
+    def finish(self, tokens_used: int | None = None) -> None:
+        self._limiter._release(self, tokens_used=tokens_used, outcome="ok")
+
+    def rate_limited(self, retry_after: float | None = None) -> None:
+        self._limiter._release(self, retry_after=retry_after, outcome="rate_limited")
+
+    def cancel(self) -> None:
+        self._limiter._release(self, outcome="cancelled")
+
+
+class RateLimiter:
+    """
+    Shared limiter keyed by provider or provider/model. Each key has a requests-per-minute
+    and a tokens-per-minute bucket plus an adaptive concurrency window (AIMD): it grows
+    while calls succeed at steady latency, halves on a 429 and shrinks when latency climbs.
+    Callers over the limit queue in FIFO order instead of failing. Keys without a
+    configured limit are never delayed. Safe to share across threads and event loops.
+    """
+
+    def __init__(self, limits: dict[str, Limit] | None = None, defaults: dict[str, Limit] | None = None):
+        self.limits: dict[str, Limit] = {}
+        self.defaults = dict(DEFAULT_LIMITS if defaults is None else defaults)
+        self._states: dict[str, _KeyState | None] = {}
+        self._lock = threading.Lock()
+        self._tickets = itertools.count()
+        self.configure(limits or {})
+
+    def configure(self, limits: dict[str, Limit | float]) -> None:
+        """
+        Override limits; a bare number is read as requests per minute, and a field left as
+        None keeps the key's current value (so "groq=30" keeps Groq's default tpm).
+        """
+        with self._lock:
+            table = dict(self.limits)
+            for key, limit in limits.items():
+                key = key.lower()
+                limit = limit if isinstance(limit, Limit) else Limit(rpm=float(limit))
+                current = self.resolve(key) or Limit()
+                table[key] = replace(
+                    limit,
+                    rpm=current.rpm if limit.rpm is None else limit.rpm,
+                    tpm=current.tpm if limit.tpm is None else limit.tpm,
+                )
+            self._set_limits(table)
+
+    @contextmanager
+    def configured(self, limits: dict[str, Limit | float]) -> Iterator["RateLimiter"]:
+        """configure() for the duration of a block, then restore the previous limits."""
+        with self._lock:
+            previous = dict(self.limits)
+        self.configure(limits)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._set_limits(previous)
+
+    def _set_limits(self, table: dict[str, Limit]) -> None:
+        """
+        Install a new limits table (lock held). Keys whose limit is unchanged keep their state;
+        changed ones get new buckets in place, keeping in-flight requests, queued waiters and
+        the learned concurrency window. Keys that lose their limit stop being delayed.
+        """
+        self.limits = table
+        for key, state in list(self._states.items()):
+            limit = self.resolve(key)
+            if not (limit and (limit.rpm or limit.tpm)):
+                self._states[key] = None
+            elif state is None:
+                del self._states[key]  # rebuilt on next use
+            elif limit != state.limit:
+                state.set_limit(limit)
+
+    def resolve(self, key: str) -> Limit | None:
+        key = key.lower()
+        provider = provider_for_model(key)
+        for table in (self.limits, self.defaults):
+            if key in table:
+                return table[key]
+            if provider in table:
+                return table[provider]
+        return None
+
+    def _state(self, key: str) -> _KeyState | None:
+        with self._lock:
+            if key not in self._states:
+                limit = self.resolve(key)
+                self._states[key] = _KeyState(key, limit) if limit and (limit.rpm or limit.tpm) else None
+            return self._states[key]
+
+    def _admit(self, state: _KeyState, ticket: int, tokens: int) -> float:
+        """Seconds to wait before `ticket` may retry, or 0.0 once it has been admitted."""
+        with self._lock:
+            return self._try_admit(state, ticket, tokens)
+
+    def _try_admit(self, state: _KeyState, ticket: int, tokens: int) -> float:
+        if state.waiters[0] != ticket:
+            return POLL_INTERVAL_SECONDS
+        now = time.monotonic()
+        if state.blocked_until > now:
+            return state.blocked_until - now
+        if state.in_flight >= max(1, int(state.concurrency)):
+            return POLL_INTERVAL_SECONDS
+        wait = max(
+            state.requests.wait_time(1, now) if state.requests else 0.0,
+            state.tokens.wait_time(tokens, now) if state.tokens else 0.0,
+        )
+        if wait > 0:
+            return wait
+        if state.requests:
+            state.requests.take(1, now)
+        if state.tokens:
+            state.tokens.take(tokens, now)
+        state.in_flight += 1
+        state.waiters.popleft()
+        return 0.0
+
+    async def acquire(self, key: str, tokens: int = 0) -> Lease:
+        """Wait until a request of about `tokens` tokens fits under the limits for `key`."""
+        state = self._state(key.lower())
+        if state is None:
+            return Lease(self, None, tokens)
+
+        ticket = next(self._tickets)
+        queued_at = time.monotonic()
+        with self._lock:
+            state.waiters.append(ticket)
+        try:
+            while (delay := self._admit(state, ticket, tokens)) > 0:
+                await asyncio.sleep(delay)
+        except BaseException:
+            with self._lock:
+                if ticket in state.waiters:
+                    state.waiters.remove(ticket)
+            raise
+
+        waited = time.monotonic() - queued_at
+        with self._lock:
+            state.counts["requests"] += 1
+            if waited > POLL_INTERVAL_SECONDS:
+                state.counts["queued"] += 1
+            state.wait_seconds += waited
+        return Lease(self, state, tokens)
+
+    @asynccontextmanager
+    async def limit(self, key: str, tokens: int = 0) -> AsyncIterator[Lease]:
+        """`async with rate_limiter.limit("serpapi"): ...` for calls with no usage to report.
+        A 429 raised inside the block is fed back as a rate-limit signal."""
+        lease = await self.acquire(key, tokens)
+        try:
+            yield lease
+        except BaseException as e:
+            if is_rate_limit_error(e):
+                lease.rate_limited(retry_after_seconds(e))
+            else:
+                lease.cancel()
+            raise
+        else:
+            lease.finish()
+
+    def _release(
+        self,
+        lease: Lease,
+        outcome: str,
+        tokens_used: int | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        state = lease._state
+        if lease.done:
+            return
+        lease.done = True
+        if state is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            state.in_flight -= 1
+            if tokens_used is not None and state.tokens:
+                state.tokens.take(tokens_used - lease.reserved_tokens, now)
+            if outcome == "rate_limited":
+                state.counts["rate_limited"] += 1
+                state.concurrency = max(1.0, state.concurrency / 2)
+                state.blocked_until = max(state.blocked_until, now + (retry_after or RATE_LIMIT_COOLDOWN_SECONDS))
+                for bucket in (state.requests, state.tokens):
+                    if bucket:
+                        bucket.drain(now)
+            elif outcome == "ok":
+                latency = now - lease.started
+                state.latency_ewma = latency if state.latency_ewma is None else (
+                    LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * state.latency_ewma
+                )
+                state.latency_floor = min(state.latency_floor or state.latency_ewma, state.latency_ewma)
+                if state.latency_ewma > LATENCY_BACKOFF_FACTOR * state.latency_floor:
+                    state.concurrency = max(1.0, state.concurrency * 0.9)
+                else:
+                    state.concurrency = min(float(MAX_CONCURRENCY), state.concurrency + 1 / state.concurrency)
+            concurrency = state.concurrency
+            pause = state.blocked_until - now
+
+        if outcome == "rate_limited":
+            log(
+                f"Rate limited by {state.key}; pausing {pause:.1f}s, concurrency now {int(concurrency)}",
+                level="warning",
+            )
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                key: {
+                    **state.counts,
+                    "concurrency": round(state.concurrency, 2),
+                    "in_flight": state.in_flight,
+                    "waiting": len(state.waiters),
+                    "wait_seconds": round(state.wait_seconds, 3),
+                }
+                for key, state in self._states.items()
+                if state is not None
+            }
+
+
+# Process-wide limits, e.g. BRANDFLOW_RATE_LIMITS="groq=30:6000,gemini=15,serpapi=20".
+rate_limiter = RateLimiter(parse_rate_limits(os.getenv("BRANDFLOW_RATE_LIMITS")))
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Hashable
+
+from logger import log
+
+SECRET_PARAMS = {"token", "api_key", "apikey", "key"}
+
+
+def make_cache_key(endpoint: str, params: dict[str, Any]) -> str:
+    """Stable key for an API call: the endpoint plus its normalized params, minus credentials."""
+    normalized = sorted(
+        (name, " ".join(str(value).split()).lower())
+        for name, value in params.items()
+        if name.lower() not in SECRET_PARAMS and value is not None
+    )
+    return endpoint + "?" + "&".join(f"{name}={value}" for name, value in normalized)
+
+
+class ResponseCache:
+    """
+    In-memory TTL cache with single-flight deduplication.
+    Concurrent callers asking for the same key share one upstream call; only
+    successful results are stored. Hit/miss/coalesced counters are kept per endpoint.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        # (event loop, key) -> [task, waiter count]
+        self._inflight: dict[tuple[int, Hashable], list] = {}
+        self._lock = threading.Lock()
+        self._stats: defaultdict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0}
+        )
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        params: dict[str, Any],
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+    ) -> Any:
+        key = make_cache_key(endpoint, params)
+        return await self.get_or_run(key, fetch, ttl, label=endpoint)
+
+    async def get_or_run(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+        label: str = "default",
+    ) -> Any:
+        # Tasks belong to one event loop, so in-flight calls are only shared within a loop.
+        inflight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats[label]["hits"] += 1
+                return entry[1]
+            flight = self._inflight.get(inflight_key)
+            if flight is None:
+                self._stats[label]["misses"] += 1
+                task = asyncio.create_task(self._fetch_and_store(key, fetch, ttl))
+                flight = self._inflight[inflight_key] = [task, 0]
+                task.add_done_callback(lambda done: self._forget(inflight_key, done))
+            else:
+                self._stats[label]["coalesced"] += 1
+                log(f"Joining in-flight request for {label}", level="info")
+            flight[1] += 1
+
+        # The call runs in its own task, so a cancelled caller does not cancel it for the
+        # others; it is only cancelled once every waiter has gone.
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            with self._lock:
+                flight[1] -= 1
+                abandoned = flight[1] == 0 and not flight[0].done()
+            if abandoned:
+                flight[0].cancel()
+
+    async def _fetch_and_store(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        value = await fetch()
+        if ttl > 0:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def _forget(self, inflight_key: tuple[int, Hashable], task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(inflight_key, [None])[0] is task:
+                del self._inflight[inflight_key]
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {label: dict(counts) for label, counts in self._stats.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
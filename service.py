@@ -0,0 +1,416 @@
+"""
+Headless HTTP API for both workflows, served from one long-lived event loop.
+
+    python service.py --host 127.0.0.1 --port 8000
+    curl -X POST localhost:8000/jobs -d '{"workflow": "personal_branding", "topic": "RAG evals"}'
+    curl localhost:8000/jobs/<id>            # status, then result
+    curl -N localhost:8000/jobs/<id>/events  # server-sent events while it runs
+
+Submitted jobs wait in a bounded queue drained by SERVICE_WORKERS workers; when the queue
+is full, POST /jobs answers 429 with Retry-After instead of accepting unbounded work.
+Jobs and results are stored in SQLite, so results outlive the process and jobs that were
+queued or running at shutdown are picked up again on the next start. All jobs share the
+process-wide caches, HTTP pools and rate limiter.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from pydantic_core import to_jsonable_python
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import bootstrap  # noqa: F401  (first: loads .env)
+from agent_cache import bypass_agent_cache
+from content_cache import CACHE_DIR
+from http_client import connection_stats
+from logger import log
+from rate_limits import rate_limiter
+from specialized_agents import registry
+from tracing import span
+from workflow_coalescing import coalesced_workflow_stream, coalescer
+
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "100"))
+SERVICE_JOB_TTL = int(os.getenv("SERVICE_JOB_TTL", str(7 * 24 * 3600)))
+SERVICE_DB_PATH = os.getenv("SERVICE_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+SSE_KEEPALIVE_SECONDS = 15.0
+WORKFLOW_OPTIONS = {
+    "personal_branding": {},
+    "twitter_meme": {
+        "source_mode": ("web_search", {"user_topic", "web_search"}),
+        "output_mode": ("meme_and_posts", {"meme_only", "posts_only", "meme_and_posts"}),
+    },
+}
+
+
+def to_jsonable(value: Any) -> Any:
+    return to_jsonable_python(value, fallback=str)
+
+
+class JobStore:
+    """SQLite-backed job records: request, status, result and timings."""
+
+    def __init__(self, path: str = SERVICE_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                workflow TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(self, workflow: str, topic: str, options: dict[str, Any]) -> dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "workflow": workflow,
+            "topic": topic,
+            "options": options,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, workflow, topic, options, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job["id"], workflow, topic, json.dumps(options), "queued", job["created_at"]),
+            )
+            self._conn.commit()
+        return job
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(to_jsonable(fields["result"]))
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        job["options"] = json.loads(job["options"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def unfinished(self) -> list[str]:
+        """Ids of jobs that were queued or running when the service last stopped, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('ok', 'error') AND finished_at < ?", (older_than,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+@dataclass
+class LiveJob:
+    """Events of a job that is queued or running, replayed to every stream subscriber."""
+    events: list[dict] = field(default_factory=list)
+    finished: bool = False
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    async def publish(self, event: dict, final: bool = False) -> None:
+        async with self.changed:
+            self.events.append(to_jsonable(event))
+            self.finished = self.finished or final
+            self.changed.notify_all()
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobRunner:
+    """Bounded job queue plus the worker tasks that drain it."""
+
+    def __init__(self, store: JobStore, workers: int = SERVICE_WORKERS, queue_size: int = SERVICE_QUEUE_SIZE):
+        self.store = store
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max(1, queue_size))
+        self.live: dict[str, LiveJob] = {}
+        self.running = 0
+        # Resumed jobs that did not fit in the queue at startup; workers move them in as slots free up.
+        self.overflow: collections.deque[str] = collections.deque()
+        self._tasks: list[asyncio.Task] = []
+        self._durations: list[float] = []
+
+    async def start(self) -> None:
+        # Import the workflows off the loop so the first job does not stall every SSE stream.
+        await asyncio.to_thread(registry.preload)
+        purged = self.store.purge(time.time() - SERVICE_JOB_TTL)
+        resumed = self.store.unfinished()
+        for job_id in resumed:
+            self.store.update(job_id, status="queued", started_at=None)
+            self.live[job_id] = LiveJob()
+            self.overflow.append(job_id)
+        self._refill()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        log(f"Service started: {self.workers} workers, {len(resumed)} jobs resumed, {purged} old jobs purged", level="highlight")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, workflow: str, topic: str, options: dict[str, Any]) -> dict:
+        if self.queue.full():
+            raise QueueFull()
+        job = self.store.create(workflow, topic, options)
+        self.live[job["id"]] = LiveJob()
+        self.queue.put_nowait(job["id"])
+        return job
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up, from recent job durations."""
+        average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        return max(1, round(average * self.queued() / self.workers))
+
+    def queued(self) -> int:
+        return self.queue.qsize() + len(self.overflow)
+
+    def _refill(self) -> None:
+        while self.overflow and not self.queue.full():
+            self.queue.put_nowait(self.overflow.popleft())
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job_id = await self.queue.get()
+            self._refill()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                log(f"Worker {number} crashed on job {job_id}: {e}", level="error")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        live = self.live.setdefault(job_id, LiveJob())
+        if job is None:
+            return
+        options = dict(job["options"])
+        fresh = options.pop("fresh", False)
+        started = time.time()
+        self.running += 1
+        self.store.update(job_id, status="running", started_at=started)
+        await live.publish({"type": "job_started", "job_id": job_id})
+        status, result, error = "ok", None, None
+        try:
+            with span("service.job", job_id=job_id, workflow=job["workflow"]), (
+                bypass_agent_cache() if fresh else nullcontext()
+            ):
+                async for event in _workflow_events(job["workflow"], job["topic"], options):
+                    if event["type"] == "result":
+                        result = event["output"]
+                    else:
+                        await live.publish(event)
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            log(f"Job {job_id} failed: {error}", level="error")
+        finally:
+            self.running -= 1
+        finished = time.time()
+        self._durations = (self._durations + [finished - started])[-50:]
+        self.store.update(job_id, status=status, result=result, error=error, finished_at=finished)
+        await live.publish({"type": "job_finished", "job_id": job_id, "status": status, "error": error}, final=True)
+        self.live.pop(job_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queued(),
+            "queue_capacity": self.queue.maxsize,
+            "jobs": self.store.counts(),
+        }
+
+
+def _workflow_events(workflow: str, topic: str, options: dict[str, Any]) -> AsyncIterator[dict]:
+    # Identical jobs submitted while one is running share that run (see workflow_coalescing).
+    return coalesced_workflow_stream(workflow, topic or None, **options)
+
+
+def parse_job_request(payload: Any) -> tuple[str, str, dict[str, Any]]:
+    """Validate a POST /jobs body into (workflow, topic, options); raises ValueError."""
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be a JSON object")
+    workflow = payload.get("workflow", "personal_branding")
+    if workflow not in WORKFLOW_OPTIONS:
+        raise ValueError(f"workflow must be one of {sorted(WORKFLOW_OPTIONS)}")
+    topic = payload.get("topic") or ""
+    if not isinstance(topic, str):
+        raise ValueError("topic must be a string")
+    options: dict[str, Any] = {}
+    for name, (default, allowed) in WORKFLOW_OPTIONS[workflow].items():
+        value = payload.get(name, default)
+        if value not in allowed:
+            raise ValueError(f"{name} must be one of {sorted(allowed)}")
+        options[name] = value
+    if workflow == "twitter_meme" and options["source_mode"] == "user_topic" and not topic.strip():
+        raise ValueError("topic is required when source_mode is user_topic")
+    if payload.get("fresh"):
+        options["fresh"] = True
+    return workflow, topic.strip(), options
+
+
+def _job_view(job: dict) -> dict:
+    return {**job, "links": {"self": f"/jobs/{job['id']}", "events": f"/jobs/{job['id']}/events"}}
+
+
+async def submit_job(request: Request) -> JSONResponse:
+    runner: JobRunner = request.app.state.runner
+    try:
+        workflow, topic, options = parse_job_request(await request.json())
+    except json.JSONDecodeError:
+        return JSONResponse({"error": "Body must be valid JSON"}, status_code=400)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    try:
+        job = runner.submit(workflow, topic, options)
+    except QueueFull:
+        retry_after = runner.retry_after()
+        return JSONResponse(
+            {"error": "Job queue is full; retry later", "retry_after": retry_after},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
+        )
+    log(f"Job {job['id']} queued ({workflow}: {topic or 'no topic'})", level="info")
+    return JSONResponse(_job_view(job), status_code=202, headers={"Location": f"/jobs/{job['id']}"})
+
+
+async def get_job(request: Request) -> JSONResponse:
+    job = request.app.state.runner.store.get(request.path_params["job_id"])
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return JSONResponse(_job_view(job))
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_job(request: Request) -> StreamingResponse | JSONResponse:
+    runner: JobRunner = request.app.state.runner
+    job_id = request.path_params["job_id"]
+    job = runner.store.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    live = runner.live.get(job_id)
+
+    async def events() -> AsyncIterator[str]:
+        if live is not None:
+            sent = 0
+            while True:
+                async with live.changed:
+                    if sent == len(live.events) and not live.finished:
+                        try:
+                            await asyncio.wait_for(live.changed.wait(), SSE_KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            pass
+                    pending, sent = live.events[sent:], len(live.events)
+                    finished = live.finished
+                if not pending and not finished:
+                    yield ": keep-alive\n\n"
+                for event in pending:
+                    yield _sse(event)
+                if finished:
+                    break
+        final = runner.store.get(job_id)
+        yield _sse({"type": "result", "job_id": job_id, "status": final["status"], "output": final["result"], "error": final["error"]})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def health(request: Request) -> JSONResponse:
+    runner: JobRunner = request.app.state.runner
+    return JSONResponse({
+        "status": "ok",
+        "queue": runner.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "connections": connection_stats(),
+        "coalescing": coalescer.stats(),
+    })
+
+
+def create_app(store: JobStore | None = None, workers: int = SERVICE_WORKERS, queue_size: int = SERVICE_QUEUE_SIZE) -> Starlette:
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        app.state.runner = JobRunner(store or JobStore(), workers=workers, queue_size=queue_size)
+        await app.state.runner.start()
+        try:
+            yield
+        finally:
+            await app.state.runner.stop()
+
+    return Starlette(
+        routes=[
+            Route("/jobs", submit_job, methods=["POST"]),
+            Route("/jobs/{job_id}", get_job, methods=["GET"]),
+            Route("/jobs/{job_id}/events", stream_job, methods=["GET"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the content workflows over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
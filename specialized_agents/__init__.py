@@ -0,0 +1,20 @@
+from dotenv import load_dotenv
+
+from .registry import WORKFLOWS, get_agent, get_workflow
+
+# Entry points load .env before their other imports; this covers importing the package directly.
+load_dotenv()
+
+_ENTRY_POINTS = {
+    attr: (name, attr == stream_attr)
+    for name, (_, run_attr, stream_attr) in WORKFLOWS.items()
+    for attr in (run_attr, stream_attr)
+}
+
+
+def __getattr__(name: str):
+    """`from specialized_agents import stream_twitter_meme_workflow` imports only that workflow."""
+    if name in _ENTRY_POINTS:
+        workflow, stream = _ENTRY_POINTS[name]
+        return get_workflow(workflow, stream=stream)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,22 @@
 import os
-from dotenv import load_dotenv
 
-from .schema import FinalContentOutput
+from .schema import (
+    FinalContentOutput,
+    ImageGenerationPrompt,
+    ImageGenerationSchema,
+    LinkedInPost,
+    TopicContent,
+    TopicTweets,
+    TopTwoTopics,
+)
 from .instructions import final_output_instructions
 
 from agents import Agent, Runner
-from agents.extensions.models.litellm_model import LitellmModel
+from .models import RateLimitedLitellmModel
 
-load_dotenv()
 groq_api_key = os.getenv('GROQ_API_KEY')
 
-model = LitellmModel(
+model = RateLimitedLitellmModel(
     model="groq/meta-llama/llama-4-scout-17b-16e-instruct",
     api_key=groq_api_key,
 )
@@ -21,4 +27,45 @@ final_output_agent = Agent(
     model=model,
     instructions=final_output_instructions,
     output_type=FinalContentOutput,
-)
\ No newline at end of file
+)
+
+
+def _require_text(value: str, field_name: str) -> str:
+    if not value or not value.strip():
+        raise ValueError(f"{field_name} is empty")
+    return value.strip()
+
+
+def _require_tweets(tweets: list[str], field_name: str) -> list[str]:
+    cleaned = [tweet.strip() for tweet in tweets if tweet and tweet.strip()]
+    if not cleaned:
+        raise ValueError(f"{field_name} has no tweets")
+    return cleaned
+
+
+def assemble_final_output(
+    plan: TopTwoTopics,
+    linkedin: list[LinkedInPost],
+    twitter: list[TopicTweets],
+    images: list[ImageGenerationPrompt],
+) -> FinalContentOutput:
+    """
+    Build FinalContentOutput directly from the typed per-plan agent outputs (index 0 for
+    plan_1, 1 for plan_2), without an LLM call. Each topic leads with its own image prompt
+    (image_1_prompt) and keeps the other topic's prompt as the alternate.
+    Raises ValueError if any piece is missing.
+    """
+    if not len(linkedin) == len(twitter) == len(images) == 2:
+        raise ValueError("expected writer outputs for exactly two plans")
+    plans = [plan.plan_1, plan.plan_2]
+    return FinalContentOutput(
+        topics=[
+            TopicContent(
+                topic=_require_text(plans[i].topic, f"plan_{i + 1}.topic"),
+                linkedin_post=_require_text(linkedin[i].post, f"plan_{i + 1} linkedin post"),
+                twitter_tweets=_require_tweets(twitter[i].tweets, f"plan_{i + 1} tweets"),
+                image_generation=ImageGenerationSchema(image_1_prompt=images[i], image_2_prompt=images[1 - i]),
+            )
+            for i in range(2)
+        ]
+    )
@@ -1,19 +1,17 @@
 import asyncio
 import os
-from dotenv import load_dotenv
 
-from .schema import ImageGenerationSchema
+from .schema import ImageGenerationPrompt
 from .instructions import image_generation_instructions
 from logger import log
 
 from agents import Agent, Runner
-from agents.extensions.models.litellm_model import LitellmModel
+from .models import RateLimitedLitellmModel
 
 
-load_dotenv()
 groq_api_key = os.getenv('GROQ_API_KEY')
 
-model = LitellmModel(
+model = RateLimitedLitellmModel(
     model="groq/llama-3.3-70b-versatile",
     api_key=groq_api_key,
 )
@@ -23,5 +21,5 @@ image_generation_agent = Agent(
     name="Image Generation Prompt Creator Agent",
     model=model,
     instructions=image_generation_instructions,
-    output_type=ImageGenerationSchema,
+    output_type=ImageGenerationPrompt,
 )
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from content_cache import CACHE_DIR
+from http_client import get_client
+from logger import log
+
+IMGFLIP_MEMES_URL = "https://api.imgflip.com/get_memes"
+CATALOG_TTL = int(os.getenv("IMGFLIP_CATALOG_TTL", str(6 * 3600)))
+CATALOG_SNAPSHOT_PATH = os.path.join(CACHE_DIR, "imgflip_templates.json")
+FUZZY_CUTOFF = 0.5
+
+
+def _normalize_name(value: str) -> str:
+    return "".join(ch.lower() for ch in value if ch.isalnum() or ch.isspace()).strip()
+
+
+def _trigrams(value: str) -> set[str]:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class TemplateCatalog:
+    """Two-box Imgflip templates with a prebuilt exact-name index and trigram index."""
+    templates: list[dict]
+    fetched_at: float
+    _by_name: dict[str, dict] = field(init=False, repr=False)
+    _trigram_index: dict[str, list[int]] = field(init=False, repr=False)
+    _trigram_counts: list[int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._by_name = {}
+        self._trigram_index = {}
+        self._trigram_counts = []
+        for pos, template in enumerate(self.templates):
+            name = _normalize_name(template["name"])
+            self._by_name.setdefault(name, template)
+            grams = _trigrams(name)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(pos)
+
+    def is_stale(self, ttl: int = CATALOG_TTL) -> bool:
+        return time.time() - self.fetched_at >= ttl
+
+    def resolve(self, template_name: str) -> dict:
+        """Exact normalized-name match, else the closest name by trigram overlap, else the top template."""
+        target = _normalize_name(template_name)
+        if target in self._by_name:
+            return self._by_name[target]
+
+        grams = _trigrams(target)
+        shared = Counter(pos for gram in grams for pos in self._trigram_index.get(gram, ()))
+        best_pos, best_score = None, FUZZY_CUTOFF
+        for pos, overlap in shared.items():
+            score = 2 * overlap / (len(grams) + self._trigram_counts[pos])
+            if score >= best_score:
+                best_pos, best_score = pos, score
+        if best_pos is not None:
+            return self.templates[best_pos]
+
+        return self.templates[0]
+
+
+def _fetch_templates() -> list[dict]:
+    response = get_client().get(IMGFLIP_MEMES_URL, timeout=15)
+    response.raise_for_status()
+
+    payload = response.json()
+    if not payload.get("success"):
+        raise RuntimeError("Imgflip template fetch failed")
+
+    templates = payload.get("data", {}).get("memes", [])
+
+    # Prefer two-box templates for consistent captioning via text0/text1.
+    two_box_templates = [t for t in templates if int(t.get("box_count", 0)) == 2]
+    if not two_box_templates:
+        raise RuntimeError("No valid two-box Imgflip templates available")
+
+    # Keep reasonably popular templates first.
+    two_box_templates.sort(key=lambda t: int(t.get("captions", 0)), reverse=True)
+    return two_box_templates[:60]
+
+
+def _load_snapshot() -> TemplateCatalog | None:
+    try:
+        with open(CATALOG_SNAPSHOT_PATH, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        return TemplateCatalog(templates=snapshot["templates"], fetched_at=snapshot["fetched_at"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        log(f"Ignoring unreadable Imgflip catalog snapshot: {e}", level="warning")
+        return None
+
+
+def _save_snapshot(catalog: TemplateCatalog) -> None:
+    os.makedirs(os.path.dirname(CATALOG_SNAPSHOT_PATH), exist_ok=True)
+    tmp_path = f"{CATALOG_SNAPSHOT_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": catalog.fetched_at, "templates": catalog.templates}, f)
+    os.replace(tmp_path, CATALOG_SNAPSHOT_PATH)
+
+
+_catalog: TemplateCatalog | None = None
+_catalog_lock = threading.Lock()
+_refresher: threading.Thread | None = None
+
+
+def refresh_template_catalog() -> TemplateCatalog:
+    """Download the template list, rebuild the indexes and persist a snapshot."""
+    global _catalog
+    catalog = TemplateCatalog(templates=_fetch_templates(), fetched_at=time.time())
+    try:
+        _save_snapshot(catalog)
+    except OSError as e:
+        log(f"Could not save Imgflip catalog snapshot: {e}", level="warning")
+    with _catalog_lock:
+        _catalog = catalog
+    log(f"Imgflip catalog refreshed ({len(catalog.templates)} templates)", level="success")
+    return catalog
+
+
+def _refresh_loop() -> None:
+    while True:
+        with _catalog_lock:
+            fetched_at = _catalog.fetched_at if _catalog else 0.0
+        time.sleep(max(0.0, fetched_at + CATALOG_TTL - time.time()))
+        try:
+            refresh_template_catalog()
+        except Exception as e:
+            log(f"Background Imgflip catalog refresh failed: {e}", level="warning")
+            time.sleep(60)
+
+
+def _ensure_refresher() -> None:
+    global _refresher
+    with _catalog_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name="imgflip-catalog-refresh", daemon=True)
+            _refresher.start()
+
+
+def get_template_catalog() -> TemplateCatalog:
+    """
+    Return the template catalog without a network round-trip whenever possible.
+    Serves the in-memory copy, else the on-disk snapshot (even if stale), and keeps
+    it fresh from a background thread. Only a cold start with no snapshot blocks on Imgflip.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = _load_snapshot()
+        catalog = _catalog
+
+    if catalog is None:
+        catalog = refresh_template_catalog()
+    _ensure_refresher()
+    return catalog
@@ -56,7 +56,7 @@ than guessing.
 #--- LinkedIn Agent Instructions ---#
 linkedin_instructions = f"""
 You are an autonomous LinkedIn Post Writer Agent. Using the provided content plan and brand context {BRAND_SUMMARY},
-write one high-quality LinkedIn post per topic from the perspective of an AI Engineer.
+write one high-quality LinkedIn post for the topic in the plan from the perspective of an AI Engineer.
 The post must prioritize practical insight, clear reasoning, and real-world relevance
 (e.g., tradeoffs, lessons, implications), dont self promote. Focus on helping the
 reader understand or think better about the topic, even if they never work with you.
@@ -81,12 +81,12 @@ Output only the tweet text, nothing else.
 #--- Image Generation Agent Instructions ---#
 image_generation_instructions = f"""
 You are an autonomous Image Prompt Generation Agent. Using the provided content plan, generate exactly
-two image prompts, one per topic. Each prompt must visually reinforce the core idea of the topic and
+one image prompt for its topic. The prompt must visually reinforce the core idea of the topic and
 reflect an AI Engineer / technical perspective (e.g., systems, architecture, data flow, tradeoffs),
 not abstract art or generic AI imagery.
 
 Prompts must be clear, concrete, and directly usable by an image generation model. Do not generate images,
-write captions or posts, add commentary, or include anything beyond the two prompts. Do not invent concepts
+write captions or posts, add commentary, or include anything beyond the prompt. Do not invent concepts
 outside the content plan or introduce branding fluff.
 """
 
@@ -1,17 +1,15 @@
 import os
-from dotenv import load_dotenv
 
-from .schema import LinkedInPostSchema
+from .schema import LinkedInPost
 from .instructions import linkedin_instructions
 
 from agents import Agent, Runner
-from agents.extensions.models.litellm_model import LitellmModel
+from .models import RateLimitedLitellmModel
 
-load_dotenv()
 google_api_key = os.getenv('GOOGLE_API_KEY')
 
 
-model = LitellmModel(
+model = RateLimitedLitellmModel(
     model="gemini/gemini-2.5-flash-lite",
     api_key=google_api_key,
 )
@@ -20,6 +18,6 @@ linkedin_agent = Agent(
     name="LinkedIn Post Writer Agent",
     model=model,
     instructions=linkedin_instructions,
-    output_type=LinkedInPostSchema,
+    output_type=LinkedInPost,
     
 )
@@ -1,81 +1,70 @@
+import asyncio
 import os
 import random
-import difflib
 from datetime import datetime
 
-import requests
-from dotenv import load_dotenv
+import httpx
 
-from agents import Runner
+from context_compaction import compact_text
+from http_client import get_async_client
 from logger import log
+from rate_limits import provider_for_url, rate_limiter
+from story_dedup import story_scope
+from tracing import annotate, span, traced
 
+from .imgflip_catalog import get_template_catalog
 from .meme_agent import meme_ideation_agent
 from .planner_agent import search_agent
+from .streaming import Emit, emit_event, run_stage, stream_workflow
 
-load_dotenv()
-
-IMGFLIP_MEMES_URL = "https://api.imgflip.com/get_memes"
 IMGFLIP_CAPTION_URL = "https://api.imgflip.com/caption_image"
 DEFAULT_FALLBACK_TOPIC = "AI agents in production"
+CAPTION_MAX_ATTEMPTS = 3
+CAPTION_BACKOFF_SECONDS = 0.5
+# Memes are meant to come out different on every run, so ideation skips the agent cache unless opted in.
+MEME_IDEATION_CACHE = os.getenv("MEME_IDEATION_CACHE", "0") == "1"
 
 
-def _normalize_name(value: str) -> str:
-    return "".join(ch.lower() for ch in value if ch.isalnum() or ch.isspace()).strip()
-
-
-def _get_imgflip_templates() -> list[dict]:
-    response = requests.get(IMGFLIP_MEMES_URL, timeout=15)
-    response.raise_for_status()
-
-    payload = response.json()
-    if not payload.get("success"):
-        raise RuntimeError("Imgflip template fetch failed")
-
-    templates = payload.get("data", {}).get("memes", [])
-
-    # Prefer two-box templates for consistent captioning via text0/text1.
-    two_box_templates = [t for t in templates if int(t.get("box_count", 0)) == 2]
-    if not two_box_templates:
-        raise RuntimeError("No valid two-box Imgflip templates available")
-
-    # Keep reasonably popular templates first.
-    two_box_templates.sort(key=lambda t: int(t.get("captions", 0)), reverse=True)
-    return two_box_templates[:60]
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
 
 
-def _resolve_template(template_name: str, templates: list[dict]) -> dict:
-    normalized_lookup = {_normalize_name(t["name"]): t for t in templates}
-    normalized_target = _normalize_name(template_name)
-
-    if normalized_target in normalized_lookup:
-        return normalized_lookup[normalized_target]
-
-    template_names = list(normalized_lookup.keys())
-    close_matches = difflib.get_close_matches(normalized_target, template_names, n=1, cutoff=0.5)
-    if close_matches:
-        return normalized_lookup[close_matches[0]]
-
-    return templates[0]
-
-def _caption_imgflip(template_id: str, top_text: str, bottom_text: str) -> str:
+@traced("imgflip.caption")
+async def _caption_imgflip(template_id: str, top_text: str, bottom_text: str) -> str:
     username = os.getenv("IMGFLIP_USERNAME")
     password = os.getenv("IMGFLIP_PASSWORD")
 
     if not username or not password:
         raise RuntimeError("Missing IMGFLIP_USERNAME or IMGFLIP_PASSWORD")
 
-    response = requests.post(
-        IMGFLIP_CAPTION_URL,
-        data={
-            "username": username,
-            "password": password,
-            "template_id": template_id,
-            "text0": top_text,
-            "text1": bottom_text,
-        },
-        timeout=20,
-    )
-    response.raise_for_status()
+    annotate(template_id=template_id)
+    for attempt in range(1, CAPTION_MAX_ATTEMPTS + 1):
+        annotate(attempts=attempt)
+        try:
+            async with rate_limiter.limit(provider_for_url(IMGFLIP_CAPTION_URL)):
+                response = await get_async_client().post(
+                    IMGFLIP_CAPTION_URL,
+                    data={
+                        "username": username,
+                        "password": password,
+                        "template_id": template_id,
+                        "text0": top_text,
+                        "text1": bottom_text,
+                    },
+                    timeout=20,
+                )
+                annotate(http_status=response.status_code)
+                response.raise_for_status()
+            break
+        except httpx.HTTPError as e:
+            if attempt == CAPTION_MAX_ATTEMPTS or not _is_retryable(e):
+                raise
+            delay = CAPTION_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            reason = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+            log(f"Imgflip caption attempt {attempt} failed ({reason}); retrying in {delay:.1f}s", level="warning")
+            await asyncio.sleep(delay)
 
     payload = response.json()
     if not payload.get("success"):
@@ -85,7 +74,16 @@ def _caption_imgflip(template_id: str, top_text: str, bottom_text: str) -> str:
     return payload["data"]["url"]
 
 
-async def _discover_topic_context(user_topic: str | None) -> tuple[str, str | None]:
+async def _render_meme(template: dict, top_text: str, bottom_text: str) -> tuple[str | None, str | None]:
+    """Caption one meme, returning (meme_url, error) so one failure does not sink the other versions."""
+    try:
+        return await _caption_imgflip(template["id"], top_text, bottom_text), None
+    except Exception as e:
+        log(f"Meme rendering failed for template {template['name']}: {e}", level="error")
+        return None, str(e)
+
+
+async def _discover_topic_context(user_topic: str | None, emit: Emit | None = None) -> tuple[str, str | None]:
     today = datetime.now().strftime("%Y-%m-%d")
     topic_hint = user_topic.strip() if user_topic else ""
 
@@ -96,8 +94,8 @@ async def _discover_topic_context(user_topic: str | None) -> tuple[str, str | No
     if topic_hint:
         prompt += f" Prioritize this user topic: {topic_hint}."
 
-    search_result = await Runner.run(search_agent, prompt)
-    notes = str(search_result.final_output)
+    with story_scope():
+        notes = str(await run_stage("research", search_agent, prompt, emit))
 
     if topic_hint:
         topic = topic_hint
@@ -117,7 +115,34 @@ async def run_twitter_meme_workflow(
     source_mode: "user_topic" | "web_search"
     output_mode: "meme_only" | "posts_only" | "meme_and_posts"
     """
+    return await _twitter_meme_pipeline(user_topic, source_mode, output_mode, emit=None)
+
+
+async def stream_twitter_meme_workflow(
+    user_topic: str | None,
+    source_mode: str,
+    output_mode: str,
+):
+    """
+    Same flow as run_twitter_meme_workflow, exposed as an async stream of events.
+    Stages are "research" (web search only), "ideation" and "rendering";
+    the last event is {"type": "result", "output": <workflow dict>}.
+    """
+    async for event in stream_workflow(
+        lambda emit: _twitter_meme_pipeline(user_topic, source_mode, output_mode, emit=emit)
+    ):
+        yield event
+
+
+@traced("workflow.twitter_meme")
+async def _twitter_meme_pipeline(
+    user_topic: str | None,
+    source_mode: str,
+    output_mode: str,
+    emit: Emit | None,
+) -> dict:
     log("Starting Twitter meme workflow", level="info")
+    annotate(user_topic=user_topic or "", source_mode=source_mode, output_mode=output_mode)
 
     if source_mode not in {"user_topic", "web_search"}:
         raise ValueError("Invalid source_mode")
@@ -127,10 +152,19 @@ async def run_twitter_meme_workflow(
     topic = (user_topic or "").strip() or DEFAULT_FALLBACK_TOPIC
     research_notes = None
 
-    if source_mode == "web_search":
-        topic, research_notes = await _discover_topic_context(user_topic)
+    # Usually served from memory/disk; on a cold start the download overlaps with web search.
+    catalog_task = asyncio.create_task(asyncio.to_thread(get_template_catalog))
 
-    templates = _get_imgflip_templates()
+    if source_mode == "web_search":
+        try:
+            topic, research_notes = await _discover_topic_context(user_topic, emit)
+        except BaseException:
+            # Don't leave the catalog task unawaited (and its error unretrieved) on failure or cancellation.
+            catalog_task.cancel()
+            raise
+
+    with span("imgflip.catalog"):
+        templates = (await catalog_task).templates
     template_options = "\n".join(f"- {t['name']} (id: {t['id']})" for t in templates)
 
     ideation_prompt = (
@@ -158,30 +192,34 @@ async def run_twitter_meme_workflow(
     f"Template options:\n{template_options}\n"
 )
     if research_notes:
-        ideation_prompt += f"\nWeb research notes:\n{research_notes}\n"
+        notes = await asyncio.to_thread(compact_text, research_notes, topic, "meme_notes")
+        ideation_prompt += f"\nWeb research notes:\n{notes}\n"
 
-    ideation_result = await Runner.run(meme_ideation_agent, ideation_prompt)
-    meme_plan = ideation_result.final_output
+    meme_plan = await run_stage("ideation", meme_ideation_agent, ideation_prompt, emit, use_cache=MEME_IDEATION_CACHE)
 
     versions = []
     generate_memes = output_mode in {"meme_only", "meme_and_posts"}
 
     # Randomize templates each run and avoid repeats across the 3 versions.
     if len(templates) >= len(meme_plan.memes):
-        randomized_templates = random.sample(templates, k=len(meme_plan.memes))
+        selected_templates = random.sample(templates, k=len(meme_plan.memes))
     else:
-        randomized_templates = [random.choice(templates) for _ in meme_plan.memes]
+        selected_templates = [random.choice(templates) for _ in meme_plan.memes]
+
+    emit_event(emit, "stage_started", "rendering")
+    if generate_memes:
+        rendered = await asyncio.gather(
+            *(
+                _render_meme(template, concept.top_text, concept.bottom_text)
+                for template, concept in zip(selected_templates, meme_plan.memes)
+            )
+        )
+    else:
+        rendered = [(None, None)] * len(meme_plan.memes)
 
     for idx, concept in enumerate(meme_plan.memes):
-        selected_template = randomized_templates[idx]
-        meme_url = None
-
-        if generate_memes:
-            meme_url = _caption_imgflip(
-                template_id=selected_template["id"],
-                top_text=concept.top_text,
-                bottom_text=concept.bottom_text,
-            )
+        selected_template = selected_templates[idx]
+        meme_url, meme_error = rendered[idx]
 
         versions.append(
             {
@@ -194,11 +232,14 @@ async def run_twitter_meme_workflow(
                 "bottom_text": concept.bottom_text,
                 "meme_caption": concept.meme_caption,
                 "meme_url": meme_url,
+                "meme_error": meme_error,
                 "twitter_post": concept.twitter_post,
                 "linkedin_post": concept.linkedin_post,
             }
         )
 
+    emit_event(emit, "stage_finished", "rendering", output=versions)
+
     return {
         "topic": meme_plan.topic or topic,
         "source_mode": source_mode,
@@ -0,0 +1,88 @@
+import os
+from typing import Any, AsyncIterator
+
+from agents.items import ModelResponse
+from agents.models.interface import Model
+
+from logger import log
+from rate_limits import is_rate_limit_error, rate_limiter, retry_after_seconds
+
+RATE_LIMIT_MAX_ATTEMPTS = int(os.getenv("LLM_RATE_LIMIT_ATTEMPTS", "5"))
+# Reserved for the completion when estimating a request's token cost up front.
+DEFAULT_OUTPUT_TOKENS = 1024
+
+
+def estimate_tokens(system_instructions: str | None, input: Any, max_tokens: int | None = None) -> int:
+    """Rough prompt + completion size (~4 chars per token) used to reserve TPM budget."""
+    prompt_chars = len(system_instructions or "") + len(str(input))
+    return prompt_chars // 4 + (max_tokens or DEFAULT_OUTPUT_TOKENS)
+
+
+class RateLimitedLitellmModel(Model):
+    """
+    Wraps a LitellmModel so every call goes through the shared rate limiter keyed by its model name.
+    Calls queue while the provider is at its RPM/TPM ceiling, and a 429 is fed back to
+    the limiter and retried after the pause instead of failing the workflow.
+    LiteLLM itself (~2.5s to import) is only loaded when the first call is made.
+    """
+
+    def __init__(self, model: str, base_url: str | None = None, api_key: str | None = None):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self._litellm_model = None
+
+    @property
+    def litellm_model(self):
+        if self._litellm_model is None:
+            from agents.extensions.models.litellm_model import LitellmModel
+
+            self._litellm_model = LitellmModel(model=self.model, base_url=self.base_url, api_key=self.api_key)
+        return self._litellm_model
+
+    def get_retry_advice(self, request):
+        return self.litellm_model.get_retry_advice(request)
+
+    def _estimate(self, system_instructions: str | None, input: Any, model_settings: Any) -> int:
+        return estimate_tokens(system_instructions, input, getattr(model_settings, "max_tokens", None))
+
+    async def get_response(self, system_instructions, input, model_settings, *args, **kwargs) -> ModelResponse:
+        estimate = self._estimate(system_instructions, input, model_settings)
+        for attempt in range(1, RATE_LIMIT_MAX_ATTEMPTS + 1):
+            lease = await rate_limiter.acquire(self.model, estimate)
+            try:
+                response = await self.litellm_model.get_response(system_instructions, input, model_settings, *args, **kwargs)
+            except BaseException as e:
+                if is_rate_limit_error(e):
+                    lease.rate_limited(retry_after_seconds(e))
+                    if attempt < RATE_LIMIT_MAX_ATTEMPTS:
+                        log(f"{self.model} returned 429; retrying (attempt {attempt + 1})", level="warning")
+                        continue
+                lease.cancel()
+                raise
+            lease.finish(response.usage.total_tokens or None)
+            return response
+
+    async def stream_response(self, system_instructions, input, model_settings, *args, **kwargs) -> AsyncIterator:
+        estimate = self._estimate(system_instructions, input, model_settings)
+        for attempt in range(1, RATE_LIMIT_MAX_ATTEMPTS + 1):
+            lease = await rate_limiter.acquire(self.model, estimate)
+            yielded = False
+            tokens_used = None
+            try:
+                async for event in self.litellm_model.stream_response(system_instructions, input, model_settings, *args, **kwargs):
+                    yielded = True
+                    if event.type == "response.completed" and event.response.usage:
+                        tokens_used = event.response.usage.total_tokens
+                    yield event
+            except BaseException as e:
+                # Once events have been forwarded the stream cannot be replayed, so only retry before that.
+                if is_rate_limit_error(e):
+                    lease.rate_limited(retry_after_seconds(e))
+                    if not yielded and attempt < RATE_LIMIT_MAX_ATTEMPTS:
+                        log(f"{self.model} returned 429; retrying (attempt {attempt + 1})", level="warning")
+                        continue
+                lease.cancel()
+                raise
+            lease.finish(tokens_used)
+            return
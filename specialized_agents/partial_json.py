@@ -0,0 +1,56 @@
+import json
+from typing import Any
+
+
+class PartialObjectParser:
+    """
+    Incremental reader for a JSON object that arrives in chunks (a streamed structured
+    output). feed() returns the top-level members whose values became complete with
+    that chunk, so callers can act on the first field before the rest is generated.
+    Text before the opening brace (e.g. a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start: int | None = None
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        self.buffer += chunk
+        completed: list[tuple[str, Any]] = []
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._depth > 0
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = self._pos + 1
+            elif char in "}]" and self._depth > 0:
+                if self._depth == 1:
+                    completed.extend(self._close_member())
+                self._depth -= 1
+            elif char == "," and self._depth == 1:
+                completed.extend(self._close_member())
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _close_member(self) -> list[tuple[str, Any]]:
+        text = self.buffer[self._member_start:self._pos].strip()
+        if not text:
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except json.JSONDecodeError:
+            return []
@@ -1,14 +1,28 @@
 import asyncio
+import contextvars
+import os
 from datetime import datetime
 
 from .planner_agent import search_agent, planner_agent
 from .linkedin_agent import linkedin_agent
 from .twitter_agent import twitter_agent
 from .image_generation_agent import image_generation_agent
-from .final_output_agent import final_output_agent
+from .final_output_agent import final_output_agent, assemble_final_output
+from .partial_json import PartialObjectParser
+from .schema import ContentPlan
+from .streaming import Emit, emit_event, run_stage, stream_workflow
 
-from agents import Runner
+from pydantic import ValidationError
+
+from context_compaction import compact_text
 from logger import log
+from story_dedup import story_scope
+from tracing import annotate, traced
+
+USE_LLM_ASSEMBLY_FALLBACK = os.getenv("USE_LLM_ASSEMBLY_FALLBACK", "0") == "1"
+PLAN_KEYS = ("plan_1", "plan_2")
+# Research notes are ranked against the user's topic, or against the brand's scope without one.
+DEFAULT_RELEVANCE_QUERY = "AI LLM RAG agents evaluation production engineering"
 
 BRAND_CONTEXT = {
   "brand_identity": {
@@ -129,25 +143,117 @@ BRAND_CONTEXT = {
   }
 }
 
-async def run_personal_branding_agent(user_topic: str | None = None):
+async def run_personal_branding_agent(
+    user_topic: str | None = None,
+    llm_fallback: bool = USE_LLM_ASSEMBLY_FALLBACK,
+):
     """
     Main orchestration function for the personal branding content creation flow.
     
     1. Call Search Agent to find topics.
     2. Call Planner Agent to create a plan based on search results.
-    3. Call LinkedIn, Twitter, and Image Generation Agents in parallel.
-    4. Call Final Output Agent to assemble the results.
+    3. Per plan, call LinkedIn, Twitter, and Image Generation Agents in parallel; each
+       plan's writers start as soon as that plan has streamed out of the planner.
+    4. Assemble the typed results into FinalContentOutput in Python.
     
     Args:
-        user_request (str): The initial user request or topic for content creation.
+        user_topic (str): Optional topic hint for content creation.
+        llm_fallback (bool): If deterministic assembly fails validation, retry it with
+            the Final Output Agent instead of raising.
         
     Returns:
         FinalContentOutput: Structured response containing content for two topics.
     """
+    return await _personal_branding_pipeline(user_topic, llm_fallback, emit=None)
+
+
+async def stream_personal_branding_agent(
+    user_topic: str | None = None,
+    llm_fallback: bool = USE_LLM_ASSEMBLY_FALLBACK,
+):
+    """
+    Same flow as run_personal_branding_agent, exposed as an async stream of events.
+    Stages are "search", "planner", "plan_1"/"plan_2" (finished as soon as each plan is
+    usable), "linkedin_N", "twitter_N", "image_N" per plan, and "assembly";
+    the last event is {"type": "result", "output": FinalContentOutput}.
+    """
+    async for event in stream_workflow(
+        lambda emit: _personal_branding_pipeline(user_topic, llm_fallback, emit=emit)
+    ):
+        yield event
+
+
+async def _write_for_plan(index: int, plan: ContentPlan, emit: Emit | None):
+    """LinkedIn, Twitter and image agents for a single plan, run in parallel."""
+    plan_input = f"Writing Plan: {plan.model_dump_json()}"
+    return await asyncio.gather(
+        run_stage(f"linkedin_{index}", linkedin_agent, plan_input, emit, context=BRAND_CONTEXT),
+        run_stage(f"twitter_{index}", twitter_agent, plan_input, emit, context=BRAND_CONTEXT),
+        run_stage(f"image_{index}", image_generation_agent, plan_input, emit, context=BRAND_CONTEXT),
+    )
+
+
+async def _plan_and_write(research_notes: str, emit: Emit | None, topic_hint: str = ""):
+    """
+    Run the planner with its output streamed, starting each plan's writers as soon as that
+    plan's JSON is complete, so plan_1's posts are underway while plan_2 is still being
+    generated. Speculatively started writers are restarted if the validated final plan
+    differs from what was streamed.
+    """
+    research_notes = await asyncio.to_thread(compact_text, research_notes, topic_hint or DEFAULT_RELEVANCE_QUERY, "planner")
+    writers: dict[str, tuple[ContentPlan, asyncio.Task]] = {}
+    plan_stream = PartialObjectParser()
+    # Writers started from the planner's stream callback still belong to the workflow span.
+    workflow_context = contextvars.copy_context()
+
+    def start_writers(key: str, plan: ContentPlan) -> None:
+        log(f"{key} ready ({plan.topic}); starting its writers", level="info")
+        emit_event(emit, "stage_finished", key, output=plan)
+        task = asyncio.create_task(
+            _write_for_plan(PLAN_KEYS.index(key) + 1, plan, emit), context=workflow_context.copy()
+        )
+        writers[key] = (plan, task)
+
+    def on_planner_delta(delta: str) -> None:
+        for key, value in plan_stream.feed(delta):
+            if key in PLAN_KEYS and key not in writers:
+                try:
+                    start_writers(key, ContentPlan.model_validate(value))
+                except ValidationError:
+                    pass  # wait for the validated final output
+
+    try:
+        content_plan = await run_stage(
+            "planner", planner_agent, f"Research Notes: {research_notes}", emit, on_delta=on_planner_delta
+        )
+        annotate(speculative_plans=len(writers))
+        for key in PLAN_KEYS:
+            plan = getattr(content_plan, key)
+            started = writers.get(key)
+            if started and started[0] != plan:
+                log(f"{key} changed after streaming; restarting its writers", level="warning")
+                started[1].cancel()
+                del writers[key]
+            if key not in writers:
+                start_writers(key, plan)
+        writer_outputs = await asyncio.gather(*(writers[key][1] for key in PLAN_KEYS))
+    except BaseException:
+        for _, task in writers.values():
+            task.cancel()
+        raise
+    return content_plan, writer_outputs
+
+
+@traced("workflow.personal_branding")
+async def _personal_branding_pipeline(
+    user_topic: str | None,
+    llm_fallback: bool,
+    emit: Emit | None,
+):
     log(f"Starting personal branding flow", level="info")
+    annotate(user_topic=user_topic or "")
     
     # 1. Search Agent: Discovers current topics
-    log("Calling Search Agent...", level="info")
     today = datetime.now().strftime('%Y-%m-%d')
     topic_hint = user_topic.strip() if user_topic else ""
     if topic_hint:
@@ -161,44 +267,37 @@ async def run_personal_branding_agent(user_topic: str | None = None):
             "Search content for today's date: "
             f"{today}. No user topic provided; generalize within AI/LLM/RAG/agent scope."
         )
-    search_result = await Runner.run(search_agent, search_prompt)
-    log("Search Agent completed.", level="success")
-    
-    # 2. Planner Agent: Creates a content plan based on search results
-    log("Calling Planner Agent...", level="info")
-    planner_result = await Runner.run(planner_agent, f"Research Notes: {search_result.final_output}")
-    log("Planner Agent completed.", level="success")
+    with story_scope():
+        research_notes = await run_stage("search", search_agent, search_prompt, emit)
     
-    # 3. Parallel Execution: LinkedIn, Twitter, and Image Generation Agents
-    log("Calling LinkedIn, Twitter, and Image Generation Agents in parallel...", level="info")
+    # 2 + 3. Planner Agent streams both plans; each plan's writers start as soon as it is complete
+    content_plan, writer_outputs = await _plan_and_write(research_notes, emit, topic_hint)
+    linkedin_posts = [linkedin for linkedin, _, _ in writer_outputs]
+    twitter_tweets = [tweets for _, tweets, _ in writer_outputs]
+    image_prompts = [image for _, _, image in writer_outputs]
+    log("Writer agents completed.", level="success")
     
-    # Prepare the input for the content creation agents (the content plan)
-    plan_input = str(planner_result.final_output)
-    
-    linkedin_task = Runner.run(linkedin_agent, f"Writing Plan: {plan_input}", context=BRAND_CONTEXT)
-    twitter_task = Runner.run(twitter_agent, f"Writing Plan: {plan_input}", context=BRAND_CONTEXT)
-    image_task = Runner.run(image_generation_agent, f"Writing Plan: {plan_input}", context=BRAND_CONTEXT)
-    
-    # Run tasks in parallel using asyncio.gather
-    linkedin_res, twitter_res, image_res = await asyncio.gather(
-        linkedin_task, twitter_task, image_task
-    )
-    log("Parallel agents completed.", level="success")
-    
-    # 4. Final Output Agent: Assembles all content into a structured response
-    log("Calling Final Output Agent...", level="info")
-    combined_input = {
-        "content_plan": planner_result.final_output,
-        "linkedin_posts": linkedin_res.final_output,
-        "twitter_tweets": twitter_res.final_output,
-        "image_prompts": image_res.final_output
-    }
-    
-    final_result = await Runner.run(final_output_agent, str(combined_input))
-    log("Final Output Agent completed.", level="success")
-    log(f"Final Output: {final_result.final_output}", level="info")
+    # 4. Assembly: typed outputs map 1:1 onto FinalContentOutput, no model call needed
+    emit_event(emit, "stage_started", "assembly")
+    try:
+        final_output = assemble_final_output(content_plan, linkedin_posts, twitter_tweets, image_prompts)
+        log("Final output assembled.", level="success")
+    except ValueError as e:
+        if not llm_fallback:
+            raise
+        log(f"Deterministic assembly failed ({e}); calling Final Output Agent...", level="warning")
+        combined_input = {
+            "content_plan": content_plan,
+            "linkedin_posts": linkedin_posts,
+            "twitter_tweets": twitter_tweets,
+            "image_prompts": image_prompts
+        }
+        final_output = await run_stage("final_output", final_output_agent, str(combined_input))
+    emit_event(emit, "stage_finished", "assembly", output=final_output)
+
+    log(f"Final Output: {final_output}", level="info")
     
-    return final_result.final_output
+    return final_output
 
 # if __name__ == "__main__":
 #     # Example usage for testing
@@ -1,9 +1,7 @@
 import os
 
-from dotenv import load_dotenv
-
 from agents import Agent, Runner
-from agents.extensions.models.litellm_model import LitellmModel
+from .models import RateLimitedLitellmModel
 
 
 from .schema import TopTwoTopics
@@ -11,15 +9,14 @@ from .tools import search_top_headlines, search_news
 from .instructions import search_instructions, planner_instructions
 from logger import log
 
-load_dotenv()
 groq_api_key = os.getenv('GROQ_API_KEY')
 
-model_search = LitellmModel(
+model_search = RateLimitedLitellmModel(
     model="groq/moonshotai/kimi-k2-instruct-0905",
     api_key=groq_api_key,
 )
 
-model_planner = LitellmModel(
+model_planner = RateLimitedLitellmModel(
     model="groq/meta-llama/llama-4-scout-17b-16e-instruct",
     api_key=groq_api_key,
 )
@@ -0,0 +1,61 @@
+import importlib
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from agents import Agent
+
+# Agents and workflows are resolved by name and their modules imported on first use, so an
+# entry point only pays for the agents SDK, the extractors and the search tools it actually runs.
+AGENTS = {
+    "search": ("planner_agent", "search_agent"),
+    "planner": ("planner_agent", "planner_agent"),
+    "linkedin": ("linkedin_agent", "linkedin_agent"),
+    "twitter": ("twitter_agent", "twitter_agent"),
+    "image_generation": ("image_generation_agent", "image_generation_agent"),
+    "final_output": ("final_output_agent", "final_output_agent"),
+    "meme_ideation": ("meme_agent", "meme_ideation_agent"),
+}
+# Imported on first use inside the workflows (model calls, token counts, article extraction).
+DEFERRED_IMPORTS = ("litellm", "newspaper", "readability")
+# workflow -> (module, run function, stream function)
+WORKFLOWS = {
+    "personal_branding": ("personal_branding_agent", "run_personal_branding_agent", "stream_personal_branding_agent"),
+    "twitter_meme": ("meme_workflow", "run_twitter_meme_workflow", "stream_twitter_meme_workflow"),
+}
+
+
+def _load(module: str, attr: str):
+    return getattr(importlib.import_module(f".{module}", __package__), attr)
+
+
+def get_agent(name: str) -> "Agent":
+    """The agent registered as `name`, importing (and so constructing) it on first use."""
+    try:
+        module, attr = AGENTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown agent {name!r}; expected one of {sorted(AGENTS)}") from None
+    return _load(module, attr)
+
+
+def all_agents() -> list["Agent"]:
+    return [get_agent(name) for name in AGENTS]
+
+
+def get_workflow(name: str, stream: bool = False) -> Callable:
+    """The run_* coroutine function of a workflow, or its stream_* event generator with stream=True."""
+    try:
+        module, run_attr, stream_attr = WORKFLOWS[name]
+    except KeyError:
+        raise ValueError(f"Unknown workflow {name!r}; expected one of {sorted(WORKFLOWS)}") from None
+    return _load(module, stream_attr if stream else run_attr)
+
+
+def preload(*workflows: str) -> None:
+    """
+    Import the given workflows (all by default) and DEFERRED_IMPORTS ahead of the first run,
+    e.g. from a warm-up thread, so that run does not pay for them.
+    """
+    for name in workflows or WORKFLOWS:
+        get_workflow(name)
+    for module in DEFERRED_IMPORTS:
+        importlib.import_module(module)
@@ -28,17 +28,15 @@ class TopTwoTopics(BaseModel):
     plan_2: ContentPlan = Field(description="The plan to write the second topic")
 
 
-#----- LinkedIn Post Generator Agent Schema --------#
-class LinkedInPostSchema(BaseModel):
-    post_1: str = Field(description="First LinkedIn post generated in markdown format")
-    post_2: str = Field(description="Second LinkedIn post generated in markdown format")
+#----- LinkedIn Post Generator Agent Schema (one plan per call) --------#
+class LinkedInPost(BaseModel):
+    post: str = Field(description="The LinkedIn post for this plan generated in markdown format")
 
-#----- Twitter Post Generator Agent Schema --------#
-class TwitterPostSchema(BaseModel):
-    topic_1_tweets: list[str] = Field(description="A list of 4 distinct tweets for the first topic (PLAN 1)")
-    topic_2_tweets: list[str] = Field(description="A list of 4 distinct tweets for the second topic (PLAN 2)")
+#----- Twitter Post Generator Agent Schema (one plan per call) --------#
+class TopicTweets(BaseModel):
+    tweets: list[str] = Field(description="A list of 4 distinct tweets for this plan's topic")
 
-#---- Image Generation Agent Schema --------#
+#---- Image Generation Agent Schema (one plan per call) --------#
 class ImageGenerationPrompt(BaseModel):
     prompt: str = Field(description="The prompt describing the image to generate")
     style: str = Field(description="The visual style or aesthetic of the image to generate")
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from openai.types.responses import ResponseTextDeltaEvent
+
+from agent_cache import cache_scope, decode_output, encode_output, get_agent_cache, is_bypassed
+from agents import Agent, Runner
+from agents.items import ToolCallOutputItem
+from logger import log
+from tracing import span
+
+# Workflow events are plain dicts:
+#   {"type": "stage_started", "stage": str}
+#   {"type": "token_delta", "stage": str, "delta": str}
+#   {"type": "stage_finished", "stage": str, "output": Any, "cached": bool}
+#   {"type": "result", "output": Any}
+Emit = Callable[[dict], None]
+
+
+def emit_event(emit: Emit | None, event_type: str, stage: str, **payload: Any) -> None:
+    if emit is not None:
+        emit({"type": event_type, "stage": stage, **payload})
+
+
+def model_name(agent: Agent) -> str:
+    return getattr(agent.model, "model", None) or type(agent.model).__name__
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float | None:
+    """USD estimate from LiteLLM's price table; None for models it does not know."""
+    try:
+        from litellm import cost_per_token, model_cost
+
+        if model not in model_cost:
+            return None
+        prompt_cost, completion_cost = cost_per_token(
+            model=model, prompt_tokens=input_tokens, completion_tokens=output_tokens
+        )
+        return round(prompt_cost + completion_cost, 6)
+    except Exception:
+        return None
+
+
+def failed_tool_calls(result: Any) -> int:
+    """
+    Tool calls in a run that returned an error payload ({"status": "error"}) or raised, in
+    which case the SDK hands the model its failure message instead of a result.
+    """
+    failed = 0
+    for item in result.new_items:
+        if not isinstance(item, ToolCallOutputItem):
+            continue
+        output = item.output
+        if isinstance(output, dict) and output.get("status") == "error":
+            failed += 1
+        elif isinstance(output, str) and output.startswith("An error occurred while running the tool"):
+            failed += 1
+    return failed
+
+
+def _agent_scope(agent: Agent, model: str) -> str:
+    return cache_scope(agent.name, model, agent.instructions, agent.output_type, [tool.name for tool in agent.tools])
+
+
+async def run_stage(
+    stage: str,
+    agent: Agent,
+    agent_input: str,
+    emit: Emit | None = None,
+    context: Any = None,
+    use_cache: bool = True,
+    on_delta: Callable[[str], None] | None = None,
+) -> Any:
+    """
+    Run one agent as a named workflow stage and return its final output.
+    With an `emit` callback the run is streamed so token deltas are forwarded as they arrive;
+    `on_delta` also forces streaming and receives the raw text deltas (e.g. to act on a
+    partially generated structured output).
+    Outputs are served from the agent output cache when the same agent already answered
+    this input (see agent_cache); `use_cache=False` or bypass_agent_cache() forces a fresh run.
+    The run context is not part of the cache key, as it never reaches the model. Runs in
+    which a tool call failed are not cached, so one transient API error does not feed
+    degraded research to every later run of the same input.
+    """
+    log(f"Calling {agent.name}...", level="info")
+    emit_event(emit, "stage_started", stage)
+    model = model_name(agent)
+    cache = get_agent_cache() if use_cache else None
+    scope = _agent_scope(agent, model) if cache else None
+    streamed = emit is not None or on_delta is not None
+    with span(f"agent.{stage}", agent=agent.name, model=model, streamed=streamed) as stage_span:
+        # SQLite (and the semantic scan) would block the loop; run lookups and writes in a thread.
+        if cache and not is_bypassed() and (hit := await asyncio.to_thread(cache.get, scope, agent_input)):
+            output = decode_output(hit.output, agent.output_type)
+            stage_span.set(cache="hit", similarity=hit.similarity, requests=0, cost_usd=0.0)
+            log(f"{agent.name} served from cache (similarity {hit.similarity})", level="success")
+            emit_event(emit, "stage_finished", stage, output=output, cached=True)
+            return output
+
+        if not streamed:
+            result = await Runner.run(agent, agent_input, context=context)
+        else:
+            result = Runner.run_streamed(agent, agent_input, context=context)
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                    emit_event(emit, "token_delta", stage, delta=event.data.delta)
+                    if on_delta is not None:
+                        on_delta(event.data.delta)
+        usage = result.context_wrapper.usage
+        stage_span.set(
+            cache="miss" if cache else None,
+            requests=usage.requests,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cost_usd=estimate_cost(model, usage.input_tokens, usage.output_tokens),
+        )
+    if cache and (failed := failed_tool_calls(result)):
+        log(f"Not caching {agent.name} output: {failed} tool call(s) failed", level="warning")
+    elif cache:
+        try:
+            await asyncio.to_thread(cache.put, scope, agent_input, encode_output(result.final_output))
+        except (TypeError, ValueError) as e:
+            log(f"Could not cache {agent.name} output: {e}", level="warning")
+    log(f"{agent.name} completed.", level="success")
+    emit_event(emit, "stage_finished", stage, output=result.final_output, cached=False)
+    return result.final_output
+
+
+async def stream_workflow(workflow: Callable[[Emit], Awaitable[Any]]) -> AsyncIterator[dict]:
+    """
+    Run `workflow(emit)` in a task and yield its events as they are emitted,
+    finishing with a {"type": "result"} event. Workflow errors are re-raised here.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(workflow(queue.put_nowait))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        yield {"type": "result", "output": task.result()}
+    finally:
+        if not task.done():
+            task.cancel()
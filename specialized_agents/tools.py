@@ -1,16 +1,58 @@
+import asyncio
 import os
-import requests
-from dotenv import load_dotenv
 
 from agents import function_tool
 
-from helper_functions import extract_content_text
-from logger import log
+from context_compaction import CONTEXT_BUDGETS, compact_documents
+from helper_functions import extract_many
+from http_client import get_async_client
+from logger import log, preview
+from rate_limits import provider_for_url, rate_limiter
+from response_cache import ResponseCache
+from story_dedup import current_registry, unseen_candidates
+from tracing import annotate, traced
+
+GNEWS_CACHE_TTL = int(os.getenv("GNEWS_CACHE_TTL", "900"))
+SERPAPI_CACHE_TTL = int(os.getenv("SERPAPI_CACHE_TTL", "1800"))
+HEADLINE_RESULTS = 2
+NEWS_RESULTS = 3
+
+# Shared by both search tools; see search_cache.stats() for hit/miss counters per endpoint.
+search_cache = ResponseCache()
+
+
+async def _get_json(url: str, params: dict) -> dict:
+    async with rate_limiter.limit(provider_for_url(url)):
+        response = await get_async_client().get(url, params=params, timeout=10)
+        response.raise_for_status()
+    return response.json()
+
+
+async def _extract_new_stories(urls: list[str | None], limit: int) -> tuple[list[tuple[int, str]], int]:
+    """
+    Extract up to `limit` articles that are new to this workflow run. URLs already seen
+    are not fetched, and texts that near-duplicate an earlier story (syndicated copies)
+    are dropped; the next candidates fill their slots. Returns the extracted pairs and
+    the number of duplicates skipped.
+    """
+    registry = current_registry()
+    candidates = unseen_candidates(urls, registry)
+    duplicates = sum(1 for url, kept in zip(urls, candidates) if url and not kept)
+
+    def accept(url: str, text: str) -> bool:
+        nonlocal duplicates
+        original = registry.claim(url, text)
+        if original is not None:
+            duplicates += 1
+            log(f"Dropping {url}: duplicate of {original}", level="info")
+        return original is None
+
+    return await extract_many(candidates, limit=limit, accept=accept), duplicates
 
-load_dotenv()
 
 @function_tool
-def search_top_headlines(category: str):
+@traced("tool.search_top_headlines")
+async def search_top_headlines(category: str):
     """
         Fetches a small, recent set of top news headlines in tech industry.
 
@@ -29,31 +71,37 @@ def search_top_headlines(category: str):
     params = {
         "category": "technology",
         "lang": "en",
-        "max": 4,
+        "max": 4,  # spare candidates backfill articles dropped as duplicates
         "country": "us",
         "token": os.getenv("GNEWS_API_KEY")
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = await search_cache.get_or_fetch(
+            url, params, lambda: _get_json(url, params), ttl=GNEWS_CACHE_TTL
+        )
+
+        articles = data.get("articles", [])
+        extracted, duplicates = await _extract_new_stories([item.get("url") for item in articles], HEADLINE_RESULTS)
+        # No query for headlines; rank article passages against their own titles.
+        titles = " ".join(articles[idx].get("title") or "" for idx, _ in extracted)
+        # Tokenizing and scoring is CPU-bound; keep it off the event loop, like the extractor chain.
+        compacted = await asyncio.to_thread(
+            compact_documents,
+            [content for _, content in extracted], titles, CONTEXT_BUDGETS["search_tools"], "search_top_headlines",
+        )
 
         headlines: list[dict[str, str]] = []
-
-        for item in data.get("articles", []):
-            if len(headlines) >= 2:
-                break
-
-            content = extract_content_text(item.get("url"))
-            if not content:
-                continue
+        for (idx, _), content in zip(extracted, compacted.texts):
+            item = articles[idx]
             headlines.append({
                     "title": item.get("title"),
                     "url_link": item.get("url"),
                     "content": content
             })
 
-        log("Headlines search successful", level="success")
-        log(f"Headlines: {headlines}", level="info")
+        annotate(candidates=len(articles), results=len(headlines), duplicates=duplicates, tokens_saved=compacted.tokens_saved)
+        log(f"Headlines search successful (cache: {search_cache.stats().get(url)})", level="success")
+        log(lambda: f"Headlines: {preview(headlines)}", level="debug")
         return {
             "status": "success",
             "headlines": headlines,
@@ -71,7 +119,8 @@ def search_top_headlines(category: str):
 
 
 @function_tool
-def search_news(query: str)->dict:
+@traced("tool.search_news")
+async def search_news(query: str)->dict:
     """
         Searches recent news articles using Google News via SerpAPI.
 
@@ -92,31 +141,33 @@ def search_news(query: str)->dict:
         "engine": "google",
         "q": query,
         "tbm": "nws",         
-        "num": 3,
+        "num": 6,  # spare candidates backfill articles dropped as duplicates
         "hl": "en",
         "api_key": os.getenv("SERP_API_KEY")
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = await search_cache.get_or_fetch(
+            url, params, lambda: _get_json(url, params), ttl=SERPAPI_CACHE_TTL
+        )
 
-        results: list[dict[str, str]] = []
+        news_results = data.get("news_results", [])
+        extracted, duplicates = await _extract_new_stories([item.get("link") for item in news_results], NEWS_RESULTS)
+        compacted = await asyncio.to_thread(
+            compact_documents, [content for _, content in extracted], query, CONTEXT_BUDGETS["search_tools"], "search_news"
+        )
 
-        for item in data.get("news_results", []):
-            if len(results) >= 3:
-                break
-            url_link = item.get("link")
-            content = extract_content_text(url_link)
-            if content:
-                results.append({
-                    "title": item.get("title"),
-                    "url_link": url_link,
-                    "content": content
-                })
+        results: list[dict[str, str]] = []
+        for (idx, _), content in zip(extracted, compacted.texts):
+            item = news_results[idx]
+            results.append({
+                "title": item.get("title"),
+                "url_link": item.get("link"),
+                "content": content
+            })
             
-        log("News search successful", level="success")
-        log(f"News search results: {results}", level="info")
+        annotate(query=query, candidates=len(news_results), results=len(results), duplicates=duplicates, tokens_saved=compacted.tokens_saved)
+        log(f"News search successful (cache: {search_cache.stats().get(url)})", level="success")
+        log(lambda: f"News search results: {preview(results)}", level="debug")
         return {
             "status": "ok",
             "query": query,
@@ -1,17 +1,15 @@
 import os
-from dotenv import load_dotenv
 
-from .schema import TwitterPostSchema
+from .schema import TopicTweets
 from .instructions import twitter_instructions
 
 from agents import Agent, Runner
-from agents.extensions.models.litellm_model import LitellmModel
+from .models import RateLimitedLitellmModel
 
-load_dotenv()
 google_api_key = os.getenv('GOOGLE_API_KEY')
 
 
-model = LitellmModel(
+model = RateLimitedLitellmModel(
     model="gemini/gemini-2.5-flash-lite",
     api_key=google_api_key,
 )
@@ -22,5 +20,5 @@ twitter_agent = Agent(
     name="Twitter Content Creator",
     model=model,
     instructions=twitter_instructions,
-    output_type=TwitterPostSchema,
+    output_type=TopicTweets,
 )
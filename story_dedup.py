@@ -0,0 +1,113 @@
+import contextvars
+import hashlib
+import re
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from content_cache import normalize_url
+from logger import log
+
+SIMHASH_BITS = 64
+# Syndicated copies of one story (new headline, trimmed paragraphs) land within a few bits;
+# distinct articles on one site still share boilerplate, so keep this well under their ~11+.
+NEAR_DUPLICATE_BITS = 6
+AMP_PARAMS = {"amp", "outputtype", "output"}
+
+
+def canonical_story_url(url: str) -> str:
+    """
+    normalize_url plus the variations news aggregators hand out for one article:
+    http/https, www./m./amp. hosts, /amp and /index.html suffixes and AMP query flags.
+    """
+    parts = urlsplit(normalize_url(url))
+    host = re.sub(r"^(?:www|m|amp)\.", "", parts.hostname or "")
+    path = re.sub(r"/(?:amp|index\.html?)$", "", parts.path) or "/"
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key.lower() not in AMP_PARAMS]
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word trigrams: near-identical texts differ in few bits."""
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class StoryRegistry:
+    """
+    Stories already handed to the model during one workflow run, shared by every search
+    tool call in it. claim() registers a story unless its canonical URL or a near-identical
+    text (SimHash within NEAR_DUPLICATE_BITS) was claimed before.
+    """
+
+    def __init__(self, max_distance: int = NEAR_DUPLICATE_BITS):
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._urls: dict[str, str] = {}
+        self._hashes: list[tuple[int, str]] = []
+        self.duplicates = 0
+
+    def seen_url(self, url: str) -> bool:
+        with self._lock:
+            return canonical_story_url(url) in self._urls
+
+    def claim(self, url: str, text: str) -> str | None:
+        """Register the story and return None, or return the URL of the story it duplicates."""
+        canonical = canonical_story_url(url)
+        fingerprint = simhash(text)
+        with self._lock:
+            original = self._urls.get(canonical)
+            if original is None:
+                original = next(
+                    (seen for value, seen in self._hashes if hamming(value, fingerprint) <= self.max_distance), None
+                )
+            if original is not None:
+                self.duplicates += 1
+                return original
+            self._urls[canonical] = url
+            self._hashes.append((fingerprint, url))
+        return None
+
+
+_registry: contextvars.ContextVar[StoryRegistry | None] = contextvars.ContextVar("story_registry", default=None)
+
+
+@contextmanager
+def story_scope() -> Iterator[StoryRegistry]:
+    """Deduplicate stories across every search tool call made inside the block."""
+    token = _registry.set(StoryRegistry())
+    try:
+        yield _registry.get()
+    finally:
+        _registry.reset(token)
+
+
+def current_registry() -> StoryRegistry:
+    """The run's registry, or a fresh one (deduplicating within a single call) outside story_scope()."""
+    return _registry.get() or StoryRegistry()
+
+
+def unseen_candidates(urls: list[str | None], registry: StoryRegistry) -> list[str | None]:
+    """Blank out URLs already claimed in this run, or repeated earlier in the list, so they are not fetched."""
+    listed: set[str] = set()
+    kept: list[str | None] = []
+    for url in urls:
+        if not url or registry.seen_url(url) or canonical_story_url(url) in listed:
+            if url:
+                log(f"Skipping duplicate story URL {url}", level="info")
+            kept.append(None)
+            continue
+        listed.add(canonical_story_url(url))
+        kept.append(url)
+    return kept
@@ -0,0 +1,238 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from http_client import get_client
+from logger import log
+
+TRACE_FILE = os.getenv("BRANDFLOW_TRACE_FILE")
+OTLP_ENDPOINT = os.getenv("BRANDFLOW_OTLP_ENDPOINT")
+EXPORT_BATCH_SIZE = 64
+EXPORT_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float = field(default_factory=time.time)
+    end_time: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    @property
+    def duration_ms(self) -> float | None:
+        if self.end_time is None:
+            return None
+        return round((self.end_time - self.start_time) * 1000, 3)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlExporter:
+    """Append one JSON object per finished span to a file."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """Send spans to an OTLP/HTTP collector using the JSON encoding (POST {endpoint}/v1/traces)."""
+
+    def __init__(self, endpoint: str, service_name: str = "brandflow"):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+
+    def export(self, spans: list[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": _otlp_value(self.service_name)}]},
+                "scopeSpans": [{
+                    "scope": {"name": "brandflow.tracing"},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            "parentSpanId": span.parent_id or "",
+                            "name": span.name,
+                            "kind": 1,
+                            "startTimeUnixNano": str(int(span.start_time * 1e9)),
+                            "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+                            "attributes": [
+                                {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                            ],
+                            "status": {"code": 2 if span.status == "error" else 1, "message": span.error or ""},
+                        }
+                        for span in spans
+                    ],
+                }],
+            }]
+        }
+        get_client().post(self.url, json=payload, timeout=5).raise_for_status()
+
+
+class BatchSpanProcessor:
+    """Hand finished spans to exporters from a background thread so tracing never blocks callers."""
+
+    def __init__(self, exporters: list):
+        self.exporters = exporters
+        self._queue: queue.Queue[Span | None] = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._worker.start()
+
+    def on_end(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch: list[Span] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: list[Span]) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch)
+            except Exception as e:
+                log(f"Span export via {type(exporter).__name__} failed: {e}", level="warning")
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+_processor: BatchSpanProcessor | None = None
+
+
+def configure_tracing(exporters: list) -> None:
+    """Replace the active exporters; an empty list turns span export off."""
+    global _processor
+    if _processor is not None:
+        _processor.shutdown()
+    _processor = BatchSpanProcessor(exporters) if exporters else None
+
+
+def _default_exporters() -> list:
+    exporters = []
+    if TRACE_FILE:
+        exporters.append(JsonlExporter(TRACE_FILE))
+    if OTLP_ENDPOINT:
+        exporters.append(OtlpHttpExporter(OTLP_ENDPOINT))
+    return exporters
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Record a timed span around a block. Spans nest through contextvars, so child spans
+    opened in awaited coroutines, tasks or asyncio.to_thread share the parent's trace.
+    """
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+    )
+    current.set(**attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_time = time.time()
+        if _processor is not None:
+            _processor.on_end(current)
+
+
+def traced(name: str) -> Callable:
+    """Decorator that wraps every call of a sync or async function in a span."""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the innermost active span, if any."""
+    active = _current_span.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+configure_tracing(_default_exporters())
+atexit.register(lambda: _processor.shutdown() if _processor else None)
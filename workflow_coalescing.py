@@ -0,0 +1,127 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Hashable
+
+from agent_cache import is_bypassed
+from logger import log
+from specialized_agents import get_workflow
+from tracing import annotate
+
+WORKFLOW_COALESCING = os.getenv("WORKFLOW_COALESCING", "1") == "1"
+
+
+def normalize_topic(topic: str | None) -> str:
+    return " ".join((topic or "").split()).lower()
+
+
+def run_key(workflow: str, topic: str | None, options: dict[str, Any], fresh: bool = False) -> tuple:
+    """
+    Identity of a workflow run: workflow, normalized topic (blank = general search), output
+    options, whether agent caches are bypassed, and the local date, since the workflows
+    search for today's news and write with today's date.
+    """
+    return (
+        workflow,
+        normalize_topic(topic),
+        tuple(sorted(options.items())),
+        fresh,
+        datetime.now().date().isoformat(),
+    )
+
+
+class _Flight:
+    """One running workflow: its events so far, replayed to every subscriber."""
+
+    def __init__(self):
+        self.events: list[dict] = []
+        self.finished = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: asyncio.Task | None = None
+
+
+class WorkflowCoalescer:
+    """
+    Single-flight for whole workflow runs. The first request for a key starts the workflow in
+    its own task; identical requests that arrive while it runs attach to it, get every event
+    emitted so far and then the live ones, and share its result. The run is cancelled once its
+    last subscriber goes away. Only in-flight runs are shared; finished ones are not cached
+    here (repeat runs reuse agent outputs through agent_cache instead).
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple[int, Hashable], _Flight] = {}
+        self._stats = {"started": 0, "joined": 0}
+
+    async def stream(self, key: Hashable, start: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        # Tasks and conditions belong to one event loop, so runs are only shared within a loop.
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._flights.get(flight_key)
+        if flight is None or flight.finished:
+            flight = _Flight()
+            self._flights[flight_key] = flight
+            flight.task = asyncio.create_task(self._produce(flight_key, flight, start()))
+            self._stats["started"] += 1
+        else:
+            self._stats["joined"] += 1
+            log(f"Joining in-flight workflow run {key} ({len(flight.events)} events so far)", level="info")
+            annotate(coalesced=True)
+
+        flight.subscribers += 1
+        seen = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: seen < len(flight.events) or flight.finished)
+                    new_events = flight.events[seen:]
+                    finished = flight.finished
+                seen += len(new_events)
+                for event in new_events:
+                    yield event
+                if finished:
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.finished and flight.task is not None:
+                flight.task.cancel()
+
+    async def _produce(self, flight_key: tuple[int, Hashable], flight: _Flight, events: AsyncIterator[dict]) -> None:
+        try:
+            async for event in events:
+                async with flight.changed:
+                    flight.events.append(event)
+                    flight.changed.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+            async with flight.changed:
+                flight.finished = True
+                flight.changed.notify_all()
+
+    def stats(self) -> dict[str, int]:
+        return {**self._stats, "in_flight": len(self._flights)}
+
+
+coalescer = WorkflowCoalescer()
+
+
+async def coalesced_workflow_stream(workflow: str, topic: str | None = None, **options: Any) -> AsyncIterator[dict]:
+    """
+    The stream_* events of `workflow`, shared with an identical run already in flight on this
+    event loop (same key as run_key). Enter bypass_agent_cache() before iterating for a fresh run.
+    """
+    def start() -> AsyncIterator[dict]:
+        return get_workflow(workflow, stream=True)(user_topic=topic, **options)
+
+    if not WORKFLOW_COALESCING:
+        events = start()
+    else:
+        events = coalescer.stream(run_key(workflow, topic, options, fresh=is_bypassed()), start)
+    async for event in events:
+        yield event